@@ -31,7 +31,7 @@ def rank_to_num(rank: str):
 
 class RankHandler:
 
-    def __init__(self, player_ranks, player_game_ranks):
+    def __init__(self, player_ranks, player_game_ranks, known_scores=None):
         """
         Creates a rank handler object; this object is intended to parse player rank information
         When creating a rank handler, the entered ranks and game ranks will be combined on a weighted average
@@ -41,30 +41,45 @@ class RankHandler:
         likely to be the most accurate
         :param player_ranks: Dictionary of seasons linked to player ranks in the form of season : rank
         :param player_game_ranks: List of recent average ranks of games
+        :param known_scores: Optional dict of player to stored rank_score, used in place of season ranks or game ranks
+        that weren't scraped (i.e. a "roles-only" scrape has no season ranks) so partial results merge with stored data
         """
         self.player_scores = defaultdict(float)
+        # Players with no season rank, game ranks or known score, left out of player_scores
+        self.unrated_players = []
         self.player_ranks = player_ranks
         self.player_game_ranks = player_game_ranks
+        self.known_scores = known_scores or dict()
         self.calculate_avg_ranks()
 
     def calculate_avg_ranks(self):
         """
         Computes a weighted avg of recent player game ranks and official in game rank
+        A part that can't be calculated (unranked in every season, no ranked games) is replaced by the known score, or
+        left out of the average if there is none; players with nothing to go on are added to unrated_players instead
         :return:
         """
-        for player in self.player_ranks:
+        for player in list(dict.fromkeys(list(self.player_ranks) + list(self.player_game_ranks))):
+            known_score = self.known_scores.get(player, -1)
             # Gather current and past season ranks and weight them
-            season_avg = self.rank_list_to_avg(player)
+            season_avg = self.rank_list_to_avg(player) if player in self.player_ranks else -1
             # Gather ranks from past 20 games and weight them
             game_avg = self.game_list_to_avg(player)
+            parts = [(weight, known_score if avg == -1 else avg)
+                     for weight, avg in [(0.65, season_avg), (0.35, game_avg)]]
+            parts = [(weight, avg) for weight, avg in parts if avg != -1]
+            if not parts:
+                print(f"No ranks found for {player}, they can't be given a rank score")
+                self.unrated_players.append(player)
+                continue
             # Based on above scores get avg rank and add it to player scores
-            final_avg = 0.65 * season_avg + 0.35 * game_avg
+            final_avg = sum(weight * avg for weight, avg in parts) / sum(weight for weight, _ in parts)
             self.player_scores[player] = round(final_avg, 5)
 
     def rank_list_to_avg(self, player):
         """
         :param player: Name of a player, their ranks over time will be average with weight applied based on recency
-        :return:Average of player ranks from recent seasons in encoded int form
+        :return:Average of player ranks from recent seasons in encoded int form, -1 if unranked in all of them
         """
         total_score = 0
         total_weight = 0
@@ -79,12 +94,13 @@ class RankHandler:
     def game_list_to_avg(self, player):
         """
         :param player: Name of a player, their games in self.player_game_ranks wil be averaged
-        :return: Average of player ranks from recent games in encoded int form
+        :return: Average of player ranks from recent games in encoded int form, -1 if there are none
         """
+        game_ranks = self.player_game_ranks.get(player, [])
         total_score = 0
-        for rank in self.player_game_ranks[player]:
+        for rank in game_ranks:
             total_score += rank_to_num(rank)
-        return total_score/len(self.player_game_ranks[player]) if len(self.player_game_ranks[player]) > 0 else -1
+        return total_score/len(game_ranks) if len(game_ranks) > 0 else -1
 
     def season_to_weight(self, season: str):
         """
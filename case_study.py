@@ -1,6 +1,8 @@
 import time
 
 import log_scraper
+from game_analytics import GameAnalytics
+from history_store import HistoryStore
 """
 The purpose of this file is to centralize analysis and data gathering for a case study regarding my performance in League within the current season
 This will be done dynamically such that the two editable global variables represent whose data and for how long this analysis will be done.
@@ -11,19 +13,37 @@ player_link = "https://www.leagueofgraphs.com/summoner/na/ArCaNeAscension-THICC"
 
 
 class CaseStudy:
-    def __init__(self, log_link):
+    def __init__(self, log_link, store=None):
+        """
+        :param log_link: league of graphs link of the player
+        :param store: Optional HistoryStore games are kept in, the default store if None
+        """
         self.player_link = log_link
+        self.player_name = log_link.split("/")[-1].replace("-", "#")
         # self.queue_type = "Normal"
+        self.store = store or HistoryStore()
+        self.analytics = None
 
     def gather_data(self):
-        scraper = log_scraper.LogScraper(self.player_link, auto_scrape=True)
+        scraper = log_scraper.LogScraper(self.player_link, auto_scrape=True, store=self.store)
         # scraper.load_more()
         # time.sleep(10)
+        self.create_database()
 
     def create_database(self):
-        pass
+        """
+        Brings the win rate, KDA, CS/min, vision and KP aggregates up to date with the stored games, only games
+        stored since the last call are read
+        :return: GameAnalytics to query, i.e. analytics.table(player_name, "champion")
+        """
+        if self.analytics is None:
+            self.analytics = GameAnalytics(self.store)
+        print(f"Added {self.analytics.update()} new games to the analytics")
+        return self.analytics
 
 
 if __name__ == '__main__':
     cs = CaseStudy(player_link)
     cs.gather_data()
+    print(cs.analytics.get(cs.player_name))
+    print(cs.analytics.table(cs.player_name, "champion"))
@@ -0,0 +1,155 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+import selenium.common.exceptions
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+"""
+Bounded pool of long lived Chrome drivers shared by scraper threads
+Starting and quitting Chrome is the slowest part of scraping a profile, so drivers are created once, checked out by a
+worker for one profile and returned afterwards; a driver is health checked before each checkout, replaced if it died
+and recycled after a number of checkouts so memory leaks in long sessions don't build up
+"""
+
+
+def default_options():
+    """
+    :return: Chrome options used by every scraper, images and javascript disabled
+    """
+    driver_options = Options()
+    driver_options.add_argument('--blink-settings=imagesEnabled=false')
+    driver_options.add_argument('--disable-javascript')
+    return driver_options
+
+
+class DriverPool:
+    def __init__(self, size=4, recycle_after_checkouts=8, options=None, create_driver=None):
+        """
+        Creates an empty pool, drivers are only started when first needed
+        :param size: Max number of drivers open at the same time
+        :param recycle_after_checkouts: Number of times a driver is checked out before it is quit and replaced; a
+        checkout scrapes one profile, which is about 3 pages (the profile and its queue tabs)
+        :param options: Chrome options of new drivers, default_options() if None
+        :param create_driver: Optional function returning a new driver, defaults to a webdriver.Chrome
+        """
+        self.size = size
+        self.recycle_after_checkouts = recycle_after_checkouts
+        self.options = options or default_options()
+        self.create_driver = create_driver or (lambda: webdriver.Chrome(options=self.options))
+        self.idle = queue.LifoQueue()
+        self.checkouts = dict()
+        self.slots = threading.Semaphore(size)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.created = 0
+        self.recycled = 0
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Checks out a healthy driver for the length of a with block, blocks while all drivers are in use
+        A driver that raised a WebDriverException in the block is quit instead of returned
+        :param timeout: Max seconds to wait for a free driver, None waits forever
+        :return: selenium driver
+        """
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        except selenium.common.exceptions.WebDriverException:
+            self.discard(driver)
+            raise
+        except BaseException:
+            self.checkin(driver)
+            raise
+        else:
+            self.checkin(driver)
+
+    def checkout(self, timeout=None):
+        """
+        Takes an idle driver, or starts a new one if fewer than size are open
+        :param timeout: Max seconds to wait for a free driver, None waits forever
+        :return: selenium driver
+        """
+        if self.closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No driver was free after {timeout} seconds")
+        try:
+            while True:
+                try:
+                    driver = self.idle.get_nowait()
+                except queue.Empty:
+                    return self._new_driver()
+                if self.is_healthy(driver):
+                    return driver
+                self._quit(driver)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def checkin(self, driver):
+        """
+        Returns a driver to the pool, quitting it if it has been checked out recycle_after_checkouts times
+        :param driver: driver from checkout
+        :return:
+        """
+        with self.lock:
+            self.checkouts[driver] = self.checkouts.get(driver, 0) + 1
+            worn_out = self.checkouts[driver] >= self.recycle_after_checkouts
+        if self.closed or worn_out:
+            if worn_out:
+                self.recycled += 1
+            self._quit(driver)
+        else:
+            self.idle.put(driver)
+        self.slots.release()
+
+    def discard(self, driver):
+        """
+        Quits a broken driver instead of returning it, its slot is freed for a new one
+        :param driver: driver from checkout
+        :return:
+        """
+        self._quit(driver)
+        self.slots.release()
+
+    def is_healthy(self, driver):
+        """
+        Checks that the browser of a driver still responds
+        :param driver: selenium driver
+        :return: True if the driver can still be used
+        """
+        try:
+            driver.window_handles
+            return True
+        except selenium.common.exceptions.WebDriverException:
+            return False
+
+    def close(self):
+        """
+        Quits every idle driver, drivers still checked out are quit when they are returned
+        :return:
+        """
+        self.closed = True
+        while True:
+            try:
+                self._quit(self.idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _new_driver(self):
+        driver = self.create_driver()
+        with self.lock:
+            self.checkouts[driver] = 0
+            self.created += 1
+        return driver
+
+    def _quit(self, driver):
+        with self.lock:
+            self.checkouts.pop(driver, None)
+        try:
+            driver.quit()
+        except selenium.common.exceptions.WebDriverException:
+            pass
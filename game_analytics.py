@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from history_store import HistoryStore
+
+"""
+Running aggregates of every stored game
+For each player the sums behind win rate, KDA, CS/min, vision and kill participation are kept per champion, role, game
+mode and week, and saved to a json file; when LogScraper adds games to the HistoryStore only the files written since
+the last update are read and added to the sums, so stats never have to be recomputed from the whole history and a
+lookup is a dict access
+"""
+
+# Columns the aggregates are built from
+COLUMNS = ["win/lose", "game_mode", "game_date", "game_duration", "champion", "role", "CS", "kills", "deaths",
+           "assists", "Vision Score", "KP"]
+# Groupings stats are kept for, "all" is every game of the player
+DIMENSIONS = ["all", "champion", "role", "game_mode", "week"]
+# Week of games without a date
+UNKNOWN_WEEK = "unknown"
+SUMS = ["games", "wins", "kills", "deaths", "assists", "cs", "minutes", "vision", "kp", "kp_games"]
+
+
+def stats(sums):
+    """
+    Turns the running sums of a group into the stats shown to users
+    :param sums: dict with the keys in SUMS
+    :return: dict of games, win_rate, kda, cs_per_min, vision and kp (average kill participation in percent)
+    """
+    games = sums["games"]
+    return dict(games=games,
+                win_rate=round(sums["wins"] / games, 4) if games else 0.0,
+                # a group without deaths counts as (kills + assists) / 1 instead of dividing by 0
+                kda=round((sums["kills"] + sums["assists"]) / max(sums["deaths"], 1), 2),
+                cs_per_min=round(sums["cs"] / sums["minutes"], 2) if sums["minutes"] else 0.0,
+                vision=round(sums["vision"] / games, 2) if games else 0.0,
+                kp=round(sums["kp"] / sums["kp_games"], 1) if sums["kp_games"] else None)
+
+
+class GameAnalytics:
+    def __init__(self, store=None, path=None):
+        """
+        Loads the saved aggregates, call update to add games stored since they were saved
+        :param store: HistoryStore the games are read from, the default store if None
+        :param path: json file the aggregates are saved to, _analytics.json in the folder of the store if None so
+        each store keeps its own aggregates
+        """
+        self.store = store or HistoryStore()
+        # The "_" prefix keeps the file out of the store's dataset, like its temporary files
+        self.path = path or os.path.join(self.store.root, "_analytics.json")
+        self.lock = threading.Lock()
+        # player -> dimension -> value -> dict of SUMS
+        self.aggregates = defaultdict(lambda: {dimension: dict() for dimension in DIMENSIONS})
+        # Store files whose games are already in the aggregates
+        self.ingested = set()
+        if os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                saved = json.load(file)
+            self.aggregates.update(saved["aggregates"])
+            self.ingested = set(saved["ingested"])
+
+    def update(self):
+        """
+        Adds the games of every store file written since the last update
+        :return: int number of games added
+        """
+        added = 0
+        with self.lock:
+            if not os.listdir(self.store.root):
+                return 0
+            for fragment in self.store.dataset().get_fragments():
+                file_name = os.path.relpath(fragment.path, self.store.root)
+                if file_name in self.ingested:
+                    continue
+                player = ds.get_partition_keys(fragment.partition_expression)["player"]
+                games = fragment.to_table(columns=COLUMNS).to_pandas(date_as_object=False)
+                self.add_games(player, games)
+                self.ingested.add(file_name)
+                added += len(games)
+            if added:
+                self.save()
+        return added
+
+    def add_games(self, player, games):
+        """
+        Adds games to the running sums of a player
+        :param player: name of the player in form of name#tag
+        :param games: DataFrame of games with the COLUMNS of a HistoryStore
+        :return:
+        """
+        kp = pd.to_numeric(games['KP'], errors="coerce")
+        values = pd.DataFrame({
+            "games": 1,
+            "wins": (games['win/lose'].astype(str) == "Victory").astype(int),
+            "kills": games['kills'], "deaths": games['deaths'], "assists": games['assists'], "cs": games['CS'],
+            "minutes": games['game_duration'].dt.total_seconds() / 60,
+            "vision": games['Vision Score'], "kp": kp.fillna(0), "kp_games": kp.notna().astype(int),
+        })
+        week = games['game_date'].dt.isocalendar()
+        # Games without a date (the UNKNOWN_SEASON of the store) are counted under their own "unknown" week
+        week = (week['year'].astype(str) + "-W" + week['week'].astype(str).str.zfill(2)).where(
+            games['game_date'].notna(), UNKNOWN_WEEK)
+        keys = {"all": pd.Series("all", index=games.index),
+                "champion": games['champion'].astype(str), "role": games['role'].astype(str),
+                "game_mode": games['game_mode'].astype(str), "week": week}
+        for dimension in DIMENSIONS:
+            groups = self.aggregates[player][dimension]
+            summed = values.groupby(keys[dimension].values).sum()
+            # records keep the int columns ints, rows would turn every sum into a float
+            for value, sums in zip(summed.index, summed.to_dict("records")):
+                group = groups.setdefault(value, dict.fromkeys(SUMS, 0))
+                for name in SUMS:
+                    group[name] += sums[name]
+
+    def get(self, player, dimension="all", value="all"):
+        """
+        :param player: name of the player in form of name#tag
+        :param dimension: one of DIMENSIONS
+        :param value: champion, role, game mode or week ("2025-W08" or UNKNOWN_WEEK) to get stats of, "all" for the "all" dimension
+        :return: dict of stats (see stats), None if the player has no games in that group
+        """
+        sums = self.aggregates.get(player, dict()).get(dimension, dict()).get(value)
+        return stats(sums) if sums else None
+
+    def table(self, player, dimension):
+        """
+        :param player: name of the player in form of name#tag
+        :param dimension: one of DIMENSIONS
+        :return: DataFrame of stats with one row per value of the dimension, most played first
+        """
+        groups = self.aggregates.get(player, dict()).get(dimension, dict())
+        rows = pd.DataFrame([dict(**{dimension: value}, **stats(sums)) for value, sums in groups.items()],
+                            columns=[dimension, "games", "win_rate", "kda", "cs_per_min", "vision", "kp"])
+        return rows.sort_values("games", ascending=False, kind="stable").reset_index(drop=True)
+
+    def save(self):
+        """
+        Writes the aggregates and the list of ingested files to path
+        :return:
+        """
+        with open(self.path + ".tmp", "w") as file:
+            json.dump(dict(aggregates=self.aggregates, ingested=sorted(self.ingested)), file)
+        os.replace(self.path + ".tmp", self.path)
+
+
+if __name__ == '__main__':
+    analytics = GameAnalytics()
+    print(f"Added {analytics.update()} games")
+    for name in analytics.aggregates:
+        print(name, analytics.get(name))
+        print(analytics.table(name, "champion").head(10))
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+import uuid
+from datetime import date
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+"""
+Append only store of every game LogScraper has seen
+Games are kept in Parquet files partitioned by player and season (the year the game was played, UNKNOWN_SEASON if
+its date couldn't be parsed), under
+root/player=<name>/season=<year>/, so an analysis only opens the files of the players and seasons it asks for and only
+reads the columns it needs; repeated names like champions, items and roles are dictionary encoded, durations are real
+durations and every game has a game_key so scraping the same games again never stores them twice
+"""
+
+STRING = pa.string()
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ("game_key", STRING),
+    ("win/lose", CATEGORY),
+    ("game_mode", CATEGORY),
+    ("game_date", pa.date32()),
+    ("game_duration", pa.duration("s")),
+    ("champion", CATEGORY),
+    ("role", CATEGORY),
+    ("CS", pa.int32()),
+    ("kills", pa.int32()),
+    ("deaths", pa.int32()),
+    ("assists", pa.int32()),
+    ("Vision Score", pa.int32()),
+    # Kill participation in percent, null when league of graphs didn't show it
+    ("KP", pa.float64()),
+    ("Summoner Spell 1", CATEGORY),
+    ("Summoner Spell 2", CATEGORY),
+    ("Item 1", CATEGORY),
+    ("Item 2", CATEGORY),
+    ("Item 3", CATEGORY),
+    ("Item 4", CATEGORY),
+    ("Item 5", CATEGORY),
+    ("Item 6", CATEGORY),
+    ("Ward", CATEGORY),
+    ("KDA", pa.float64()),
+    ("CS/min", pa.float64()),
+])
+# Season of games whose date couldn't be parsed, so they are still stored and deduplicated
+UNKNOWN_SEASON = 0
+PARTITIONING = ds.partitioning(pa.schema([("player", STRING), ("season", pa.int32())]), flavor="hive")
+
+
+def legacy_game_key(games):
+    """
+    Keys for games saved before LogScraper added game_key, i.e. an old data_to_analyze.csv
+    :param games: DataFrame in the LogScraper format
+    :return: Series of str keys
+    """
+    return (games['game_date'].astype(str) + "|" + games['champion'].astype(str) + "|" +
+            games['game_duration'].astype(str) + "|" + games['kills'].astype(str) + "/" +
+            games['deaths'].astype(str) + "/" + games['assists'].astype(str))
+
+
+def to_table(games):
+    """
+    Converts LogScraper games into the store schema
+    :param games: DataFrame in the LogScraper format with a game_key column, game_date as dates or iso strings and
+    game_duration as timedeltas or "hh:mm:ss" strings
+    :return: pyarrow Table with SCHEMA
+    """
+    games = games.copy()
+    games['game_date'] = pd.to_datetime(games['game_date']).dt.date
+    games['game_duration'] = pd.to_timedelta(games['game_duration'])
+    games['KP'] = pd.to_numeric(games['KP'].astype(str).str.rstrip("%"), errors="coerce")
+    # LogScraper fills empty item, spell and role slots with "None", stored as nulls
+    for field in SCHEMA:
+        if field.type == CATEGORY:
+            games[field.name] = games[field.name].where(games[field.name] != "None", None)
+    return pa.Table.from_pandas(games[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+
+class HistoryStore:
+    def __init__(self, root="history"):
+        """
+        Opens a store, creating its folder if needed
+        :param root: Folder of the store
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def partition_dir(self, player, season):
+        """
+        :param player: name of the player in form of name#tag
+        :param season: int year, UNKNOWN_SEASON for games without a date
+        :return: folder of the player and season, the name is escaped the way pyarrow reads hive partitions
+        """
+        return os.path.join(self.root, f"player={quote(player, safe='')}", f"season={season}")
+
+    def dataset(self):
+        """
+        :return: pyarrow Dataset over every stored game, with player and season read from the folder names
+        """
+        return ds.dataset(self.root, schema=SCHEMA.append(pa.field("player", STRING)).append(
+            pa.field("season", pa.int32())), format="parquet", partitioning=PARTITIONING)
+
+    def keys(self, player):
+        """
+        :param player: name of the player in form of name#tag
+        :return: set of game keys stored for the player
+        """
+        if not os.path.exists(os.path.join(self.root, f"player={quote(player, safe='')}")):
+            return set()
+        return set(self.dataset().to_table(columns=["game_key"], filter=pc.field("player") == player)
+                   .column("game_key").to_pylist())
+
+    def append(self, player, games):
+        """
+        Stores the games of a player that aren't stored yet, one new file per season they were played in
+        :param player: name of the player in form of name#tag
+        :param games: DataFrame from LogScraper, see to_table
+        :return: int number of new games stored
+        """
+        if games is None or len(games) == 0:
+            return 0
+        if 'game_key' not in games:
+            games = games.assign(game_key=legacy_game_key(games))
+        # A game seen twice in the same batch is only kept once
+        games = games.drop_duplicates('game_key')
+        with self.lock:
+            table = to_table(games[~games['game_key'].isin(self.keys(player))])
+            years = pc.fill_null(pc.year(table.column("game_date")), UNKNOWN_SEASON)
+            for season in pc.unique(years).to_pylist():
+                part = table.filter(pc.equal(years, season))
+                folder = self.partition_dir(player, season)
+                os.makedirs(folder, exist_ok=True)
+                file_name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+                # Written under a "_" name first, which pyarrow skips, so readers never see half a file and a crash
+                # before the rename leaves nothing that is read as data
+                pq.write_table(part, os.path.join(folder, "_" + file_name), compression="zstd")
+                os.replace(os.path.join(folder, "_" + file_name), os.path.join(folder, file_name))
+        return table.num_rows
+
+    def read(self, player=None, columns=None, start=None, end=None):
+        """
+        Reads stored games, only the files and columns needed are opened
+        :param player: Only games of this player if given
+        :param columns: Names of the columns to read, every column if None
+        :param start: Optional first date to include
+        :param end: Optional last date to include
+        :return: DataFrame of the games newest first, dictionary encoded columns become categoricals and empty slots
+        are null
+        """
+        condition = None
+
+        def both(a, b):
+            return b if a is None else a & b
+        if player is not None:
+            condition = both(condition, pc.field("player") == player)
+        # Seasons outside the range are skipped by folder, the dates are then checked within the files left
+        if start is not None:
+            condition = both(condition, (pc.field("season") >= start.year) & (pc.field("game_date") >= start))
+        if end is not None:
+            condition = both(condition, (pc.field("season") <= end.year) & (pc.field("game_date") <= end))
+        if not os.listdir(self.root):
+            return pd.DataFrame(columns=columns or SCHEMA.names)
+        games = self.dataset().to_table(columns=columns, filter=condition).to_pandas(date_as_object=False)
+        if "game_date" in games:
+            games = games.sort_values("game_date", ascending=False, kind="stable").reset_index(drop=True)
+        return games
+
+    def players(self):
+        """
+        :return: List of names of every player with stored games
+        """
+        if not os.listdir(self.root):
+            return []
+        return sorted(set(self.dataset().to_table(columns=["player"]).column("player").to_pylist()))
+
+
+if __name__ == '__main__':
+    # Imports the saved data_to_analyze.csv and reads the last month of it back
+    store = HistoryStore()
+    print(f"Stored {store.append('ArCaNeAscension#THICC', pd.read_csv('data_to_analyze.csv'))} new games")
+    read_start = time.perf_counter()
+    recent = store.read("ArCaNeAscension#THICC", columns=["game_date", "champion", "KDA"],
+                        start=date(2025, 1, 20), end=date(2025, 2, 19))
+    print(recent.head(10))
+    print(f"Read {len(recent)} games in {time.perf_counter() - read_start:.3f} seconds")
@@ -0,0 +1,116 @@
+import random
+import time
+from collections import Counter
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+import match_solver
+from match_maker import MatchMaker, merge_lane_weights
+from player import Player
+
+"""
+Splits any number of players into balanced 10 player lobbies
+All players are placed at once by solving a single assignment problem of players to (lobby, role, side) slots,
+so the time grows polynomially with the number of players instead of brute forcing every lobby; only the roles and
+sides within each 10 player lobby are then solved exactly
+"""
+
+
+class LobbyMaker:
+    LOBBY_SIZE = 10
+    # Number of assignment rounds, each one re-centers the lane targets on the pairs found by the last
+    REFINE_ROUNDS = 3
+
+    def __init__(self, player_list, preference_weight=match_solver.PREFERENCE_WEIGHT, lane_weights=None):
+        """
+        Creates as many balanced lobbies as possible from the given players
+        Players are seated in the order they signed up, anyone past the last full lobby is placed on the bench
+        :param player_list: List of player objects in sign-up order
+        :param preference_weight: Weight of role preferences against rank differences, see match_solver
+        :param lane_weights: Optional dict of role to how much that lane counts, see MatchMaker
+        """
+        self.players = player_list
+        self.preference_weight = preference_weight
+        self.lane_weights = merge_lane_weights(lane_weights)
+        lobby_count = len(self.players) // self.LOBBY_SIZE
+        self.bench = self.players[lobby_count * self.LOBBY_SIZE:]
+        self.lobbies = self.make_lobbies(self.players[:lobby_count * self.LOBBY_SIZE])
+
+    def __str__(self):
+        """
+        Displays all lobbies and the bench in string format
+        :return:
+        """
+        output = ""
+        for i, lobby in enumerate(self.lobbies):
+            output += f"Lobby {i + 1}:\n{lobby}\n"
+        output += f"Bench: {[p.name for p in self.bench]}"
+        return output
+
+    def lobby_targets(self, players):
+        """
+        Splits players into skill bands by rank_score, one band per lobby
+        :param players: List of seated player objects
+        :return: array of the average rank of each lobby
+        """
+        scores = np.sort([player.rank_score for player in players])
+        return scores.reshape(-1, self.LOBBY_SIZE).mean(axis=1)
+
+    def make_lobbies(self, players):
+        """
+        Assigns every seated player to a lobby, role and side
+        Each slot costs the players preference cost for the role plus how far their rank in that role is from the
+        slot's target rank, the cheapest overall assignment is then found with the hungarian algorithm; it only
+        decides who plays in which lobby, each lobby's roles and sides are then found with match_solver.solve_exact
+        :param players: List of player objects, length must be a multiple of LOBBY_SIZE
+        :return: List of MatchMaker objects, one per lobby
+        """
+        if not players:
+            return []
+        ranks, preference = match_solver.score_matrices(players)
+        lanes = np.arange(5)
+        # targets[lobby, role] starts as the lobby's skill band, later rounds pull each lane towards its own pair
+        targets = np.repeat(self.lobby_targets(players)[:, None], 5, axis=1)
+        for _ in range(self.REFINE_ROUNDS):
+            # cost[p, lobby, role], then each role is repeated for both sides
+            cost = self.preference_weight * preference[:, None, :] + np.abs(ranks[:, None, :] - targets[None, :, :])
+            cost = np.repeat(cost, 2, axis=2).reshape(len(players), -1)
+            player_idx, slot_idx = linear_sum_assignment(cost)
+            # slots[lobby, role, side] holds the index of the player seated there
+            slots = np.empty(len(players), dtype=int)
+            slots[slot_idx] = player_idx
+            slots = slots.reshape(len(targets), 5, 2)
+            targets = ranks[slots, lanes[None, :, None]].mean(axis=2)
+
+        solver_weights = np.array([self.lane_weights[role] for role in match_solver.ROLES])
+        lobbies = []
+        for lobby in slots:
+            lobby_players = [players[i] for i in lobby.flatten()]
+            assignments, cost = match_solver.solve_exact(lobby_players, self.preference_weight,
+                                                         lane_weights=solver_weights)
+            lobbies.append(MatchMaker(lobby_players, options=[(assignments, cost)], lane_weights=self.lane_weights))
+        return lobbies
+
+
+def random_player(name):
+    """
+    Creates a player with a random rank and random role history, used for benchmarking
+    :param name: Name of the player
+    :return: Player object
+    """
+    champs = {role: Counter({"Champ": random.choice([0, 0, 1, 3, 8])}) for role in match_solver.ROLES}
+    return Player(name, round(random.uniform(0, 30), 2), champs, [])
+
+
+if __name__ == '__main__':
+    # Benchmark showing how lobby creation grows with the number of players
+    random.seed(0)
+    for size in [10, 30, 100, 200, 500, 1000]:
+        pool = [random_player(f"player{i}#NA1") for i in range(size)]
+        start = time.perf_counter()
+        lobby_maker = LobbyMaker(pool)
+        elapsed = time.perf_counter() - start
+        diffs = [abs(lobby.best_match_diff) for lobby in lobby_maker.lobbies]
+        print(f"{size} players: {len(lobby_maker.lobbies)} lobbies, {len(lobby_maker.bench)} benched, "
+              f"{elapsed * 1000:.1f} ms, avg |match diff| {sum(diffs) / len(diffs):.2f}")
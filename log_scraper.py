@@ -1,7 +1,10 @@
-import re
+import json
+import os
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from functools import lru_cache
 import dateparser
+import lxml.html
 import pandas as pd
 import selenium.common.exceptions
 from selenium import webdriver
@@ -11,178 +14,373 @@ from collections import defaultdict
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from collections import Counter
+from opgg_http import element_text
 """
 A scraper for league of graphs
 The match history on this site goes back much farther than op.gg, so it is better for long term data
 """
 
+# XPaths of every column, relative to one game row of the match history table
+HISTORY_ROWS = "//table[contains(@class,'recentGamesTable')]//tr[td[contains(@class,'resultCellLight')]]"
+HISTORY_COLUMNS = dict(
+    win_lose=".//a/div[contains(@class,'victoryDefeatText')]",
+    game_mode=".//td[contains(@class,'resultCellLight')]//div[contains(@class,'gameMode')]",
+    game_date=".//td[contains(@class,'resultCellLight')]//div[contains(@class,'gameDate')]",
+    game_duration=".//td[contains(@class,'resultCellLight')]//div[contains(@class,'gameDuration')]",
+    kills=".//div[@class='kda']/span[@class = 'kills']",
+    deaths=".//div[@class='kda']/span[@class = 'deaths']",
+    assists=".//div[@class='kda']/span[@class = 'assists']",
+    champion=".//td[@class='championCellLight']//img[contains(@class,'champion')]",
+    summoners=".//td[@class='summonersTdLight']//div[contains(@class,'txt ')]",
+    tooltip=".//td[contains(@class,'kdaColumn')]/a[@class='full-cell']/div[contains(@class,'display-block')]",
+    spells=".//td[@class='championCellLight']//img[contains(@class,'spell')]",
+    items=".//td[@class='itemsColumnLight']//div[@class='display-block']//img[contains(@class,'item')]",
+)
+# Collects every column of every game in one pass in the browser, one object per game row
+HISTORY_SCRIPT = """
+const all = (xpath, root) => {
+    const found = document.evaluate(xpath, root || document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    return Array.from({length: found.snapshotLength}, (_, i) => found.snapshotItem(i));
+};
+const columns = %s;
+const text = (row, column) => { const e = all(columns[column], row)[0]; return e ? e.innerText.trim() : ""; };
+const number = (row, column) => parseInt(text(row, column)) || 0;
+return all("%s").slice(arguments[0] || 0).map(row => ({
+    win_lose: text(row, "win_lose"),
+    game_mode: text(row, "game_mode"),
+    game_date: text(row, "game_date"),
+    game_duration: text(row, "game_duration"),
+    kills: number(row, "kills"),
+    deaths: number(row, "deaths"),
+    assists: number(row, "assists"),
+    champion: (all(columns.champion, row)[0] || {getAttribute: () => null}).getAttribute("alt"),
+    summoners: all(columns.summoners, row).map(e => e.innerText.trim()),
+    tooltip: (all(columns.tooltip, row)[0] || {getAttribute: () => null}).getAttribute("tooltip"),
+    spells: all(columns.spells, row).map(e => e.getAttribute("alt")),
+    items: all(columns.items, row).map(e => e.getAttribute("alt")),
+}));
+""" % (json.dumps(HISTORY_COLUMNS), HISTORY_ROWS)
+# Removes the first arguments[0] game rows once they have been parsed, so the page doesn't grow with the history
+PRUNE_ROWS_SCRIPT = """
+const found = document.evaluate("%s", document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < Math.min(arguments[0], found.snapshotLength); i++) {
+    found.snapshotItem(i).remove();
+}
+""" % HISTORY_ROWS
+
+
+def game_key(row):
+    """
+    Fingerprint of a game row so it can be recognised on a later scrape
+    :param row: dict from HISTORY_SCRIPT
+    :return: str key
+    """
+    return "|".join([row["champion"] or ""] + row["summoners"] + [row["game_duration"]])
+
+
+@lru_cache(maxsize=4096)
+def resolve_date(time_str, today):
+    """
+    Resolves a date as shown on league of graphs, i.e. "2 days ago" or "19/02/2025", dateparser is slow so every
+    string is only parsed once per day; relative strings are resolved against the time of the first lookup of the day
+    :param time_str: str date shown for a game
+    :param today: date the string is relative to, part of the cache key so "2 days ago" changes with the day
+    :return: date or None if it can't be parsed
+    """
+    parsed_date = dateparser.parse(time_str, languages=["en"],
+                                   settings={'RELATIVE_BASE': datetime.combine(today, datetime.now().time())})
+    return parsed_date.date() if parsed_date else None
+
+
+def pad_items(items):
+    """
+    Lines the items of a game up with the 6 item slots and the ward slot
+    :param items: List of item names in the order shown
+    :return: List of 7 item names, "None" for empty slots
+    """
+    wards = ["Farsight Alteration", "Stealth Ward", "Oracle Lens", "Arcane Sweeper", "Poro-Snax"]
+    items = list(items)
+    if len(items) == 0:
+        items = ["None"]*7
+    elif len(items) < 7:
+        ward = None
+        if items[-1] in wards:
+            ward = items[-1]
+            items[-1] = "None"
+        # add Nones until length is 7
+        items.extend(["None"]*(7-len(items)))
+        if ward:
+            items[-1] = ward
+    return items[:7]
+
+
+def parse_history_rows(html):
+    """
+    Same as HISTORY_SCRIPT without a browser, used to parse saved pages
+    :param html: str html of a match history page, or its already parsed lxml tree
+    :return: List of dicts, one per game row
+    """
+    def text(row, column):
+        found = row.xpath(HISTORY_COLUMNS[column])
+        return element_text(found[0]) if found else ""
+
+    def number(row, column):
+        value = text(row, column)
+        return int(value) if value.isdigit() else 0
+
+    def attribute(row, column, name):
+        found = row.xpath(HISTORY_COLUMNS[column])
+        return found[0].get(name) if found else None
+
+    rows = []
+    tree = lxml.html.fromstring(html) if isinstance(html, str) else html
+    for row in tree.xpath(HISTORY_ROWS):
+        rows.append(dict(win_lose=text(row, "win_lose"), game_mode=text(row, "game_mode"),
+                         game_date=text(row, "game_date"), game_duration=text(row, "game_duration"),
+                         kills=number(row, "kills"), deaths=number(row, "deaths"), assists=number(row, "assists"),
+                         champion=attribute(row, "champion", "alt"),
+                         summoners=[element_text(e) for e in row.xpath(HISTORY_COLUMNS["summoners"])],
+                         tooltip=attribute(row, "tooltip", "tooltip"),
+                         spells=[e.get("alt") for e in row.xpath(HISTORY_COLUMNS["spells"])],
+                         items=[e.get("alt") for e in row.xpath(HISTORY_COLUMNS["items"])]))
+    return rows
+
 
 class LogScraper:
-    def __init__(self, player_link, auto_scrape=True):
+    def __init__(self, player_link, auto_scrape=True, driver=None, snapshots=None, csv_path="data_to_analyze.csv",
+                 history_path=None, prune=True, store=None):
+        """
+        Creates a scraper for the match history of one player
+        :param player_link: league of graphs link of the player
+        :param auto_scrape: Whether the scraper will start as soon as its made
+        :param driver: Optional driver that already has the page open, i.e. a ReplayDriver to re-parse a saved page
+        :param snapshots: Optional SnapshotStore the fully loaded match history page is saved to
+        :param csv_path: File the DataFrame is written to after a scrape, None to not write it
+        :param history_path: Optional csv file games are appended to, if given auto_scrape streams the history into
+        it batch by batch instead of loading it all at once, see stream
+        :param prune: Whether streaming removes parsed rows from the page to keep its memory use flat
+        :param store: Optional HistoryStore new games are appended to after a scrape or streamed batch
+        """
         self.start_time = time.time()
+        # Seconds each stage of the last scrape took, see mark
+        self.stage_times = dict()
+        self.last_mark = self.start_time
+        self.csv_path = csv_path
+        self.history_path = history_path
+        self.prune = prune
+        self.store = store
         pd.set_option('display.width', 400)
         pd.set_option('display.max_columns', 20)
         self.player_link = player_link
         self.player_name = player_link.split("/")[-1].replace("-", "#")
         self.role_list = ["Top", "Jungle", "Mid", "Adc", "Support"]
-        driver_options = Options()
-        driver_options.add_argument('--blink-settings=imagesEnabled=false')
-        driver_options.add_argument('--disable-javascript')
-        self.driver = webdriver.Chrome(options=driver_options)
-        # load link
-        self.driver.get(self.player_link)
-        WebDriverWait(self.driver, 5).until(
-            EC.presence_of_element_located((By.XPATH, "//div[@class = 'recentGamesTableHeaderTitle']"))
-        )
-        if auto_scrape:
-            self.scrape()
+        self.snapshots = snapshots
         self.df = None
+        # Saved pages are already fully loaded, only a live page needs the show more button pressed
+        self.live = driver is None
+        if driver:
+            self.driver = driver
+        else:
+            driver_options = Options()
+            driver_options.add_argument('--blink-settings=imagesEnabled=false')
+            driver_options.add_argument('--disable-javascript')
+            self.driver = webdriver.Chrome(options=driver_options)
+            # load link
+            self.driver.get(self.player_link)
+            WebDriverWait(self.driver, 5).until(
+                EC.presence_of_element_located((By.XPATH, "//div[@class = 'recentGamesTableHeaderTitle']"))
+            )
+        if auto_scrape and history_path:
+            self.stream()
+        elif auto_scrape:
+            self.scrape()
 
     def scrape(self):
-        self.load_more()
-        print(f"button pressing done after {time.time()-self.start_time} seconds")
-        win_lose = [wl.text for wl in self.driver.find_elements(by=By.XPATH, value="//a/div[contains(@class,"
-                                                                                   "'victoryDefeatText')]")]
-        print(f"win-lose done after {time.time() - self.start_time} seconds", len(win_lose))
-        game_mode = [gm.text for gm in
-                 self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "td[contains(@class,'resultCellLight')]//"
-                                                              "div[contains(@class,'gameMode')]")]
-        print(f"game mode done after {time.time() - self.start_time} seconds", len(game_mode))
-
-        def parse_relative_date(time_str):
-            parsed_date = dateparser.parse(time_str, settings={'RELATIVE_BASE': datetime.now()})
-            return parsed_date.date() if parsed_date else None
-        game_date = [parse_relative_date(gd.text) for gd in
-                     self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                                  "td[contains(@class,'resultCellLight')]//"
-                                                                  "div[contains(@class,'gameDate')]")]
-        print(f"game date done after {time.time() - self.start_time} seconds", len(game_date))
-
-        def parse_duration(s):
-            match = re.match(r"(\d+)min (\d+)s", s)
-            if match:
-                minutes, seconds = map(int, match.groups())
-                return timedelta(minutes=minutes, seconds=seconds)
-            else:
-                return timedelta(seconds=0)
-        game_duration = [parse_duration(gd.text) for gd in
-                     self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                                  "td[contains(@class,'resultCellLight')]//"
-                                                                  "div[contains(@class,'gameDuration')]")]
-        print(f"game duration done after {time.time() - self.start_time} seconds", len(game_duration))
-        kills = [int(k.text) for k in
-                 self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "div[@class='kda']/span[@class = 'kills']")]
-        deaths = [int(d.text) for d in
-                 self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "div[@class='kda']/span[@class = 'deaths']")]
-        assists = [int(a.text) for a in
-                 self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "div[@class='kda']/span[@class = 'assists']")]
-        #KDA is kills, deaths, and assists
-        # kdas = [f"{k}/{d}/{a}" for k, d, a in zip(kills, deaths, assists)]
-        print(f"kda done after {time.time() - self.start_time} seconds", len(kills))
-        champs_per_game = [c.get_attribute("alt") for c in
-                 self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "td[@class='championCellLight']//"
-                                                              "img[contains(@class,'champion')]")]
-        print(f"champs done after {time.time() - self.start_time} seconds", len(champs_per_game))
-        role_groups = self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "td[@class='summonersTdLight']")
-        roles = []
-        for group in role_groups:
-            group_roles = [c.text for c in group.find_elements(by=By.XPATH, value=".//div[contains(@class,'txt ')]")]
-            try:
-                ind = group_roles.index(self.player_name)
-                roles.append(self.role_list[ind % 5])
-            except:
-                roles.append("None")
-        print(f"roles done after {time.time() - self.start_time} seconds", len(roles))
-        # roles = [c.text for c in
-        #          self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-        #                                                       "td[@class='summonersTdLight']//"
-        #                                                       "div[contains(@class,'txt ')]")]
-        # convert role from player list to role base on location in list
-        # roles = [self.role_list[(i % 10) % 5] for i, p in enumerate(roles) if p == self.player_name]
-
-        tooltips = [v.get_attribute('tooltip') for v in
-                 self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                              "td[contains(@class,'kdaColumn')]/"
-                                                              "a[@class='full-cell']/"
-                                                              "div[contains(@class,'display-block')]")]
-        # read vision score and cs from tool tip
-        vision_score = []
-        cs = []
-        kp = []
-        for tooltip in tooltips:
-            if tooltip and "Vision Score: " in tooltip:
-                vision_score.append(int(tooltip.split("Vision Score: ")[-1].split("<")[0]))
-            else:
-                vision_score.append(0)
-            if tooltip and "Minions: " in tooltip:
-                cs.append(int(tooltip.split("Minions: ")[-1].split("<")[0]))
-            else:
-                cs.append(0)
-            if tooltip and "Kill participation: " in tooltip:
-                kp.append(tooltip.split("Kill participation: ")[-1].split("<")[0])
-            else:
-                kp.append("None")
-        print(f"tooltips/vs/cs/kp done after {time.time() - self.start_time} seconds", len(tooltips))
-
-        summoner_spell_groups = self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                                        "td[@class='championCellLight']")
-        grouped_summs = []
-        for group in summoner_spell_groups:
-            summs = [img.get_attribute("alt") for img in group.find_elements(by=By.XPATH,
-                                                                             value=".//img[contains(@class,'spell')]")]
-            if len(summs) < 2:
-                summs.extend(["None"]*(2-len(summs)))
-            grouped_summs.append(summs)
-        print(f"summs done after {time.time() - self.start_time} seconds", len(grouped_summs))
-        item_groups = self.driver.find_elements(by=By.XPATH, value="//table[contains(@class,'recentGamesTable')]//"
-                                                          "td[@class='itemsColumnLight']//div[@class='display-block']")
-        grouped_items = []
-        wards = ["Farsight Alteration", "Stealth Ward", "Oracle Lens", "Arcane Sweeper", "Poro-Snax"]
-        for group in item_groups:
-            items = [img.get_attribute("alt") for img in group.find_elements(By.XPATH, ".//img[contains(@class,'item')]")]
-            if len(items) == 0:
-                items = ["None"]*7
-            elif len(items) < 7:
-                ward = None
-                if items[-1] in wards:
-                    ward = items[-1]
-                    items[-1] = "None"
-                # add Nones until length is 7
-                items.extend(["None"]*(7-len(items)))
-                if ward:
-                    items[-1] = ward
-            grouped_items.append(items)
-        print(f"item groups done after {time.time() - self.start_time} seconds", len(grouped_items))
-        self.df = pd.DataFrame(
-            list(zip(win_lose, game_mode, game_date, game_duration, champs_per_game, roles, cs,
-                     kills, deaths, assists, vision_score, kp)),
-            columns=["win/lose", "game_mode", "game_date", "game_duration", "champion", "role", "CS",
-                     "kills", "deaths", "assists", "Vision Score", "KP"])
-        if len(grouped_summs) == len(self.df):
-            self.df[['Summoner Spell 1', 'Summoner Spell 2']] = grouped_summs
-        else:
-            self.df[['Summoner Spell 1', 'Summoner Spell 2']] = grouped_summs[:len(self.df)]
-        if len(grouped_items) == len(self.df):
-            self.df[['Item 1', 'Item 2', 'Item 3', 'Item 4', 'Item 5', 'Item 6', 'Ward']] = grouped_items
-        else:
-            self.df[['Item 1', 'Item 2', 'Item 3', 'Item 4', 'Item 5', 'Item 6', 'Ward']] = grouped_items[:len(self.df)]
-        self.df['KDA'] = ((self.df['kills'] + self.df['assists']) / self.df['deaths']).round(2)
-        self.df['CS/min'] = (self.df['CS'] / (self.df['game_duration'].dt.total_seconds() / 60)).round(2)
-        # Replace any errors with 0.0
-        self.df['KDA'] = self.df['KDA'].replace([float('inf'), float('nan')], 0.0)
-        self.df['CS/min'] = self.df['CS/min'].where(self.df['game_duration'].dt.total_seconds() > 0, 0.0)
-        # Remove '0 days'
-        self.df['game_duration'] = self.df['game_duration'].astype(str).str.replace("0 days ", "", regex=False)
+        self.last_mark = time.time()
+        if self.live:
+            self.load_more()
+            self.mark("button pressing")
+            if self.snapshots is not None:
+                self.snapshots.put(self.player_name, "log", "match_history", self.driver.page_source, self.player_link)
+        rows = self.driver.execute_script(HISTORY_SCRIPT)
+        self.mark("rows", len(rows))
+        if not rows:
+            print(f"No games found in the match history of {self.player_name}")
+        self.df = self.rows_to_frame(rows)
         print(self.df.head(5))
         print(self.df.tail(5))
         print(self.df.info())
-        self.df.to_csv("data_to_analyze.csv", index=False)
+        if self.csv_path:
+            self.df.to_csv(self.csv_path, index=False)
+        if self.store is not None:
+            print(f"Stored {self.store.append(self.player_name, self.df)} new games of {self.player_name}")
+
+    def rows_to_frame(self, rows):
+        """
+        Turns game rows into the match history DataFrame, parsing each column at once instead of game by game
+        :param rows: List of dicts from HISTORY_SCRIPT
+        :return: DataFrame with one game per row
+        """
+        raw = pd.DataFrame(rows, columns=["win_lose", "game_mode", "game_date", "game_duration", "champion",
+                                          "summoners", "tooltip", "kills", "deaths", "assists", "spells", "items"])
+        today = date.today()
+        game_date = raw['game_date'].map(lambda time_str: resolve_date(time_str, today))
+        self.mark("game date", len(game_date))
+
+        parts = raw['game_duration'].str.extract(r"^(\d+)min (\d+)s").astype(float).fillna(0)
+        game_duration = pd.to_timedelta(parts[0] * 60 + parts[1], unit="s")
+        self.mark("game duration", len(game_duration))
+
+        # convert the players place in the list of summoners to their role
+        roles = [self.role_list[names.index(self.player_name) % 5] if self.player_name in names else "None"
+                 for names in raw['summoners']]
+        self.mark("roles", len(roles))
+
+        # read vision score, cs and kp from tool tip, the last value after each label up to the next tag
+        def tooltip_field(label):
+            return raw['tooltip'].str.extract(f"(?s).*{label}: ([^<]*)", expand=False)
+        vision_score = pd.to_numeric(tooltip_field("Vision Score"), errors="coerce").fillna(0).astype(int)
+        cs = pd.to_numeric(tooltip_field("Minions"), errors="coerce").fillna(0).astype(int)
+        kp = tooltip_field("Kill participation").fillna("None")
+        self.mark("tooltips/vs/cs/kp", len(raw))
+
+        grouped_summs = [(spells + ["None"] * 2)[:2] for spells in raw['spells']]
+        grouped_items = [pad_items(items) for items in raw['items']]
+        self.mark("summs/items", len(grouped_items))
+        # Every value comes from its own game row, so the columns always line up
+        df = pd.DataFrame({"win/lose": raw['win_lose'], "game_mode": raw['game_mode'], "game_date": game_date,
+                           "game_duration": game_duration, "champion": raw['champion'], "role": roles, "CS": cs,
+                           "kills": raw['kills'], "deaths": raw['deaths'], "assists": raw['assists'],
+                           "Vision Score": vision_score, "KP": kp})
+        # Columns are named up front so a history without games still gets every column
+        summ_columns = ['Summoner Spell 1', 'Summoner Spell 2']
+        df[summ_columns] = pd.DataFrame(grouped_summs, index=df.index, columns=summ_columns)
+        item_columns = ['Item 1', 'Item 2', 'Item 3', 'Item 4', 'Item 5', 'Item 6', 'Ward']
+        df[item_columns] = pd.DataFrame(grouped_items, index=df.index, columns=item_columns)
+        df['KDA'] = ((df['kills'] + df['assists']) / df['deaths']).round(2)
+        df['CS/min'] = (df['CS'] / (df['game_duration'].dt.total_seconds() / 60)).round(2)
+        # Replace any errors with 0.0
+        df['KDA'] = df['KDA'].replace([float('inf'), float('nan')], 0.0)
+        df['CS/min'] = df['CS/min'].where(df['game_duration'].dt.total_seconds() > 0, 0.0)
+        # Remove '0 days'
+        df['game_duration'] = df['game_duration'].astype(str).str.replace("0 days ", "", regex=False)
+        # League of graphs shows no game id, a game is recognised by its champ, 10 summoners and duration
+        df['game_key'] = [game_key(row) for row in rows]
+        self.mark("dataframe", len(df))
+        return df
+
+    def stream(self):
+        """
+        Parses the match history batch by batch as the show more button loads it, appending new games to history_path
+        Parsed rows are removed from the page (unless prune is False) and only the current batch is held in memory;
+        stops at the first game already in history_path unless an earlier run was interrupted before reaching the
+        oldest game, in which case it keeps loading and resumes from where that run stopped; a run that only adds new
+        games and is interrupted leaves resume_from, the key of the last game it wrote, so the next run goes past the
+        games it wrote and stops at the first stored game after that one
+        :return: int number of new games written
+        """
+        self.last_mark = time.time()
+        known_keys = self.stored_keys()
+        checkpoint = self.read_checkpoint()
+        # Without a finished run on disk every game down to the oldest one is wanted
+        backfill = not checkpoint.get("complete", False)
+        if checkpoint and backfill:
+            print(f"Resuming interrupted history of {self.player_name}, oldest game so far {checkpoint['oldest_date']}")
+        resume_from = None if backfill else checkpoint.get("resume_from")
+        if resume_from:
+            print(f"Resuming interrupted update of {self.player_name}")
+        # Whether the game the interrupted run stopped at has been seen, stored games before it were written by that run
+        passed_resume = resume_from is None
+        oldest_date = checkpoint.get("oldest_date")
+        parsed = 0
+        new_games = 0
+        complete = False
+        while True:
+            rows = self.driver.execute_script(HISTORY_SCRIPT, 0 if self.prune else parsed)
+            if self.prune:
+                self.driver.execute_script(PRUNE_ROWS_SCRIPT, len(rows))
+            parsed += len(rows)
+            batch = self.rows_to_frame(rows) if rows else None
+            reached_stored = False
+            if batch is not None:
+                stored = batch['game_key'].isin(known_keys)
+                keys = list(batch['game_key'])
+                # Only games after the point the interrupted run stopped at are checked and can be resumed from
+                start = 0 if passed_resume else keys.index(resume_from) + 1 if resume_from in keys else len(keys)
+                passed_resume = passed_resume or resume_from in keys
+                reached_stored = bool(stored.iloc[start:].any())
+                written = [key for key, is_stored in zip(keys[start:], stored.iloc[start:]) if not is_stored]
+                if written:
+                    resume_from = written[-1]
+                batch = batch[~stored]
+            if batch is not None and len(batch):
+                # Saved before the games so a crash while writing them still leaves where to resume from
+                self.write_checkpoint(oldest_date=oldest_date, complete=not backfill,
+                                      resume_from=None if backfill else resume_from)
+                batch.to_csv(self.history_path, mode="a", index=False, header=not os.path.exists(self.history_path))
+                known_keys.update(batch['game_key'])
+                if self.store is not None:
+                    self.store.append(self.player_name, batch)
+                new_games += len(batch)
+                dates = [str(game_date) for game_date in batch['game_date'] if game_date]
+                oldest_date = min(dates + ([oldest_date] if oldest_date else [])) if dates else oldest_date
+            if reached_stored and not backfill:
+                complete = True
+                break
+            # Saved after every batch so an interrupted run knows how far it got, a finished backfill stays complete
+            self.write_checkpoint(oldest_date=oldest_date, complete=not backfill,
+                                  resume_from=None if backfill else resume_from)
+            if not self.live or not self.load_next_batch():
+                complete = True
+                break
+            print(f"Loaded {parsed} games of {self.player_name}, {new_games} new")
+        self.write_checkpoint(oldest_date=oldest_date, complete=complete)
+        self.mark("stream", new_games)
+        return new_games
+
+    def stored_keys(self):
+        """
+        :return: set of game keys already written to history_path
+        """
+        if not os.path.exists(self.history_path):
+            return set()
+        return set(pd.read_csv(self.history_path, usecols=['game_key'])['game_key'])
+
+    def read_checkpoint(self):
+        """
+        :return: dict saved by write_checkpoint, empty if history_path has never been streamed to
+        """
+        if not os.path.exists(self.history_path + ".checkpoint.json"):
+            return dict()
+        with open(self.history_path + ".checkpoint.json", "r") as file:
+            return json.load(file)
+
+    def write_checkpoint(self, oldest_date, complete, resume_from=None):
+        """
+        Records how far streaming got next to history_path
+        :param oldest_date: str iso date of the oldest game written so far
+        :param complete: Whether every game down to the oldest one has been written
+        :param resume_from: game_key of the last game written by an unfinished update of a complete history, None
+        when there is nothing to resume
+        :return:
+        """
+        path = self.history_path + ".checkpoint.json"
+        with open(path + ".tmp", "w") as file:
+            json.dump(dict(oldest_date=oldest_date, complete=complete, resume_from=resume_from,
+                           updated=datetime.now().isoformat()), file)
+        os.replace(path + ".tmp", path)
+
+    def mark(self, stage, count=None):
+        """
+        Records how long a stage of scrape took since the previous stage finished and prints the running total
+        :param stage: name of the stage that just finished
+        :param count: Optional number of values the stage found, printed to spot columns that don't line up
+        :return:
+        """
+        now = time.time()
+        self.stage_times[stage] = now - self.last_mark
+        self.last_mark = now
+        print(f"{stage} done after {now - self.start_time} seconds", *([count] if count is not None else []))
 
     def load_more(self):
         """
@@ -190,31 +388,39 @@ class LogScraper:
         :return:
         """
         i = 0
-        while True:
+        while self.load_next_batch():
+            i += 1
+            print(f"Button has been pressed {i} times")
+        print("Exiting loop")
+
+    def load_next_batch(self):
+        """
+        Presses the show more button once and waits for the next games to load
+        :return: False once the button is gone, True otherwise
+        """
+        try:
+            # Wait for the button to be clickable
+            button = WebDriverWait(self.driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH,
+                                            "//table[contains(@class,'recentGamesTable')]//"
+                                            "button[contains(@class, 'see_more')]"))
+            )
+            # Click
+            self.driver.execute_script("arguments[0].click();", button)
+            # Wait for loading to complete (could be checking for the button to be disabled)
+            WebDriverWait(self.driver, 10).until(
+                EC.invisibility_of_element_located((By.XPATH,
+                                                    "//table[contains(@class,'recentGamesTable')]//"
+                                                    "button[contains(@class, 'see_more') and @disabled]"))
+            )
+            return True
+        # Exception rather than a bare except so an interrupted stream stops instead of pressing on
+        except Exception:
             try:
-                # Wait for the button to be clickable
-                button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH,
-                                                "//table[contains(@class,'recentGamesTable')]//"
-                                                "button[contains(@class, 'see_more')]"))
-                )
-                # Click
-                self.driver.execute_script("arguments[0].click();", button)
-                # Wait for loading to complete (could be checking for the button to be disabled)
-                WebDriverWait(self.driver, 10).until(
-                    EC.invisibility_of_element_located((By.XPATH,
-                                                        "//table[contains(@class,'recentGamesTable')]//"
-                                                        "button[contains(@class, 'see_more') and @disabled]"))
-                )
-                i += 1
-                print(f"Button has been pressed {i} times")
-            except:
-                # If the button is no longer found, break the loop
-                try:
-                    # If button take too long to load, double check its gone and not still loading
-                    self.driver.find_element(By.XPATH,
-                                             "//table[contains(@class,'recentGamesTable')]//"
-                                             "button[contains(@class, 'see_more')]")
-                except:
-                    print("Exiting loop")
-                    break
\ No newline at end of file
+                # If button take too long to load, double check its gone and not still loading
+                self.driver.find_element(By.XPATH,
+                                         "//table[contains(@class,'recentGamesTable')]//"
+                                         "button[contains(@class, 'see_more')]")
+                return True
+            except Exception:
+                return False
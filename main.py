@@ -1,19 +1,27 @@
 from opgg_Scraper import OpggScraper
-from Rank_handler import RankHandler, rank_to_points
-from player import Player, convert_to_name
+from Rank_handler import rank_to_points
+from player import Player, convert_to_name, players_from_scraper
 from storage_tool import StorageTool
 from match_maker import MatchMaker
-from flask import Flask, render_template, request, redirect, url_for, jsonify
-import os, signal
+from team_jobs import TeamJobManager
+from refresh_scheduler import RefreshScheduler
+from snapshot_store import SnapshotStore
+from flask import Flask, render_template, request, redirect, url_for, jsonify, Response
+import json, os, signal
+from datetime import datetime
 
 app = Flask(__name__)
 
 
-def create_players_from_link_doc(link_doc, force_reset=False) -> list[Player]:
+def create_players_from_link_doc(link_doc, force_reset=False, scheduler=None, snapshots=None) -> list[Player]:
     """
     Creates Player objects for each valid op.gg link found in link_doc
     :param link_doc: The document to scrape op.gg links
     :param force_reset: Forces scraping regardless of date
+    :param scheduler: Optional RefreshScheduler, if given old stored data is used as is and left for it to refresh,
+    only players with no stored data at all are scraped right away
+    :param snapshots: Optional SnapshotStore every scraped page is saved to, so players can be rebuilt with
+    snapshot_replay.py after a parser fix
     :return: The list of created player objects list[Player]
     """
     p_list = []
@@ -28,26 +36,41 @@ def create_players_from_link_doc(link_doc, force_reset=False) -> list[Player]:
             print(f"Force resetting info for: {convert_to_name(p)}")
     else:
         for player in p_list:
-            player_data = storage.get_player(convert_to_name(player))
+            if scheduler:
+                player_data = storage.get_player(convert_to_name(player), max_age=None)
+            else:
+                player_data = storage.get_player(convert_to_name(player))
             if player_data:
                 players.append(player_data)
             else:
                 to_scrape.append(player)
 
     if to_scrape:
-        scraper = OpggScraper(player_list=to_scrape, auto_scrape=True)
+        # Games already stored are skipped and new ones merged in, unless everything is being reset
+        history = dict() if force_reset else storage.get_history([convert_to_name(p) for p in to_scrape])
+        scraper = OpggScraper(player_list=to_scrape, auto_scrape=True, history=history, snapshots=snapshots)
         # print(scraper)
         scraper.quit_driver()
-        rank_handler = RankHandler(scraper.player_ranks, scraper.player_game_ranks)
-        # print(rank_handler)
-        for player in rank_handler.player_scores:
-            p = Player(player, rank_handler.player_scores[player], scraper.player_champs[player],
-                       scraper.player_mastery[player])
+        for p in players_from_scraper(scraper):
             storage.add_player(p)
             players.append(p)
+            if scheduler:
+                scheduler.schedule(p.name, datetime.now() + scheduler.refresh_after)
     return players
 
 
+def replace_player(refreshed):
+    """
+    Puts a player refreshed by the refresh scheduler in place of the stale one in players, teams already made keep
+    the old one until teams are made again
+    :param refreshed: Player object the scheduler just saved
+    :return:
+    """
+    for i, player in enumerate(players):
+        if player.name == refreshed.name:
+            players[i] = refreshed
+
+
 @app.route("/")
 def index():
     """
@@ -96,6 +119,11 @@ def update_player():
             role_ranks.append(("flex", role_ranks[-1][1], total_chance))
         # sort by new_chance, keep flex at the end
         role_ranks = sorted(role_ranks[:-1], key=lambda x: x[2], reverse=True) + [role_ranks[-1]]
+        # The refresh scheduler may have stored newer games since the page was loaded, they are kept
+        scraped_data = storage.get_scraped_data(player.name)
+        if scraped_data:
+            for attribute, value in scraped_data.items():
+                setattr(player, attribute, value)
         player.update_roles(role_ranks)
         storage.add_player(player, overwrite_time=False)
     return redirect(url_for("index"))
@@ -124,18 +152,38 @@ def swap_players():
 
     player_indexes = data['players']
     try:
-        player_1 = index_to_location(player_indexes[0])
-        player_2 = index_to_location(player_indexes[1])
-        temp = match_algo.assignments[player_1[0]][player_1[1]]
-        match_algo.assignments[player_1[0]][player_1[1]] = match_algo.assignments[player_2[0]][player_2[1]]
-        match_algo.assignments[player_2[0]][player_2[1]] = temp
-        match_algo.lane_diffs = match_algo.calc_lane_diffs()
-        match_algo.best_match_diff = match_algo.calc_match_diff()
+        match_algo.swap_players(index_to_location(player_indexes[0]), index_to_location(player_indexes[1]))
         return jsonify({"success": "Players swapped"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/best_swaps', methods=['GET'])
+def best_swaps():
+    """
+    Scores every possible swap of two players in the current teams
+    :return: json of the current cost and all 45 swaps ranked best first
+    """
+    current_cost, swaps = match_algo.rank_swaps()
+    return jsonify({"current_cost": current_cost, "swaps": swaps}), 200
+
+
+@app.route('/apply_best_swap', methods=['POST'])
+def apply_best_swap():
+    """
+    Receives button info from display_teams.html; applies the best ranked swap if it improves the current teams
+    :return: Returns an error if failed and success message if succeed
+    """
+    try:
+        current_cost, swaps = match_algo.rank_swaps()
+        if swaps[0]["cost"] >= current_cost:
+            return jsonify({"success": "No swap improves the current teams"}), 200
+        match_algo.swap_players(*[index_to_location(i) for i in swaps[0]["players"]])
+        return jsonify({"success": f"Swapped {swaps[0]['names'][0]} and {swaps[0]['names'][1]}"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/make_teams", methods=["POST"])
 def make_team():
     """
@@ -143,17 +191,105 @@ def make_team():
     :return: Redirects to display_teams
     """
     global match_algo
-    match_algo = MatchMaker(players)
+    match_algo = MatchMaker(players, option_count=team_options)
+    return redirect(url_for("display_teams"))
+
+
+@app.route("/team_jobs", methods=["POST"])
+def start_team_job():
+    """
+    Starts generating teams in the background; json body may set "mode", "time_budget" (seconds, cut down to
+    TeamJobManager.max_time_budget), "seed" and "lane_weights", exact jobs keep team_options options
+    :return: json with the id of the new job
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        job = team_jobs.submit(players, mode=data.get("mode", "monte_carlo"), time_budget=data.get("time_budget"),
+                               seed=data.get("seed"), lane_weights=data.get("lane_weights"),
+                               option_count=team_options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"job_id": job.job_id}), 202
+
+
+@app.route("/team_jobs/<job_id>", methods=["GET"])
+def team_job_status(job_id):
+    """
+    Polls a background job
+    :param job_id: id returned by start_team_job
+    :return: json of the job status and the best teams found so far
+    """
+    job = team_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route("/team_jobs/<job_id>/stream", methods=["GET"])
+def stream_team_job(job_id):
+    """
+    Streams a background job as server-sent events, a new event is sent each time the job improves or finishes
+    :param job_id: id returned by start_team_job
+    :return: text/event-stream response
+    """
+    job = team_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    def events():
+        version = -1
+        while True:
+            new_version = job.wait_for_update(version)
+            if new_version != version:
+                version = new_version
+                yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.is_finished() and job.version == version:
+                break
+
+    return Response(events(), mimetype="text/event-stream")
+
+
+@app.route("/team_jobs/<job_id>/cancel", methods=["POST"])
+def cancel_team_job(job_id):
+    """
+    Cancels a background job, the best teams found so far are kept
+    :param job_id: id returned by start_team_job
+    :return: json of the job status
+    """
+    job = team_jobs.cancel(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route("/team_jobs/<job_id>/use", methods=["POST"])
+def use_team_job(job_id):
+    """
+    Shows the best teams found by a background job on display_teams
+    :param job_id: id returned by start_team_job
+    :return: Redirects to display_teams
+    """
+    global match_algo
+    job = team_jobs.get(job_id)
+    if not job or not job.best:
+        return jsonify({"error": "No teams found for this job yet"}), 404
+    # Every option the job found is kept so ?option= paging works like after make_teams
+    match_algo = MatchMaker(job.players, options=job.best.options, lane_weights=job.lane_weights)
     return redirect(url_for("display_teams"))
 
 
 @app.route("/display_teams")
 def display_teams():
     """
-    Displays created team
-    :return: Renders display_teams.html
+    Displays created team; ?option=i switches to another of the matchups found by make_team without recomputing
+    :return: Renders display_teams.html, or redirects to the page without ?option once the option is selected so
+    reloading it after a swap doesn't select the option again and undo the swap
     """
-    # TODO currently, display teams only accepts 1 team, allow it to display multiple
+    option = request.args.get("option", type=int)
+    if option is not None:
+        if 0 <= option < len(match_algo.options) and option != match_algo.option_index:
+            match_algo.select_option(option)
+        return redirect(url_for("display_teams"))
     return render_template("display_teams.html", match_data=match_algo)
 
 
@@ -168,15 +304,29 @@ def stop_server():
 
 
 if __name__ == '__main__':
-    # Initiate storage tool, scrape players, initialize the match algorithm, and start the app
-    storage = StorageTool()
-    # TODO instead of scraping have players enter info to google sheet and take from there?
-    players = create_players_from_link_doc("links.txt", force_reset=False)
-    players = sorted(players, key=lambda p: p.name)
-    dropdown_roles = ["top", "jungle", "mid", "adc", "supp", "flex"]
-    dropdown_ranks = rank_to_points.keys()
-    divisions = ["N/A", "1", "2", "3", "4"]
-    match_algo = MatchMaker(players)
-    app.run(debug=True)
-
-
+    app.debug = True
+    if app.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        # The debug reloader only watches for changes in this process and runs this file again in a child process that
+        # serves requests, players are loaded and refreshed in that one alone
+        app.run()
+    else:
+        # Initiate storage tool, scrape players, initialize the match algorithm, and start the app
+        storage = StorageTool()
+        # Every page scraped at startup or by the scheduler is archived for snapshot_replay.py
+        snapshots = SnapshotStore()
+        # Refreshes stored players in the background so startup doesn't wait on scraping
+        refresh_scheduler = RefreshScheduler(storage, snapshots=snapshots, on_refresh=replace_player)
+        # TODO instead of scraping have players enter info to google sheet and take from there?
+        players = create_players_from_link_doc("links.txt", force_reset=False, scheduler=refresh_scheduler,
+                                               snapshots=snapshots)
+        players = sorted(players, key=lambda p: p.name)
+        # Started once players exists, so every refreshed player can be swapped into it
+        refresh_scheduler.start()
+        dropdown_roles = ["top", "jungle", "mid", "adc", "supp", "flex"]
+        dropdown_ranks = rank_to_points.keys()
+        divisions = ["N/A", "1", "2", "3", "4"]
+        # Number of distinct matchups to offer each time teams are made
+        team_options = 5
+        match_algo = MatchMaker(players, option_count=team_options)
+        team_jobs = TeamJobManager()
+        app.run()
@@ -0,0 +1,194 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+import match_solver
+from lobby_maker import LobbyMaker
+from match_maker import MatchMaker
+from player import Player
+
+"""
+Benchmark and quality suite for team generation
+Synthetic rosters are drawn from the rank and role distributions of stored players, every algorithm is run many times
+per roster size and latency percentiles are reported next to the spread of match diffs and how often players are
+auto-filled; results can be saved and compared against a saved baseline to catch regressions
+"""
+
+# Algorithms that can be benchmarked, lobby is the only one that accepts more than 10 players
+ALGORITHMS = ["exact", "monte_carlo", "random", "lobby"]
+# Metrics where a higher value is a regression, compared against the baseline with --tolerance
+REGRESSION_METRICS = ["latency_p50_ms", "latency_p99_ms", "abs_diff_mean", "autofill_rate"]
+
+
+class SyntheticRosters:
+    def __init__(self, source="known_players.json", seed=0):
+        """
+        Creates a generator of realistic rosters based on stored players
+        :param source: json file in the StorageTool format to take distributions from
+        :param seed: Seed of the random generator so rosters can be reproduced
+        """
+        with open(source, 'r') as file:
+            self.templates = list(json.load(file).values())
+        self.random = random.Random(seed)
+        scores = [template["rank_score"] for template in self.templates]
+        self.rank_spread = float(np.std(scores)) or 1.0
+        # How often each role shows up at each position of preferred_roles
+        self.role_counts_by_position = [Counter() for _ in range(5)]
+        for template in self.templates:
+            for i, role in enumerate(template["preferred_roles"]):
+                if role != "flex":
+                    self.role_counts_by_position[i][role] += 1
+        self.created = 0
+
+    def player(self):
+        """
+        Creates one player from a random stored player, with a jittered rank and roles redrawn by position
+        :return: Player object
+        """
+        template = self.random.choice(self.templates)
+        rank_score = round(min(36, max(0, self.random.gauss(template["rank_score"], self.rank_spread))), 2)
+        preferred_roles = []
+        role_chances = dict()
+        for i, role in enumerate(template["preferred_roles"]):
+            if role == "flex":
+                preferred_roles.append("flex")
+                break
+            options = {r: count + 1 for r, count in self.role_counts_by_position[i].items()
+                       if r not in preferred_roles}
+            options.update({r: 1 for r in match_solver.ROLES if r not in preferred_roles and r not in options})
+            new_role = self.random.choices(list(options), list(options.values()), k=1)[0]
+            preferred_roles.append(new_role)
+            role_chances[new_role] = template["role_chances"][role]
+        role_chances.update({role: 0 for role in match_solver.ROLES if role not in role_chances})
+        role_ranks = {role: rank_score for role in match_solver.ROLES + ["flex"]}
+        self.created += 1
+        champs = {role: Counter() for role in match_solver.ROLES}
+        return Player(f"synthetic{self.created}#BENCH", rank_score, champs, [], role_ranks,
+                      role_chances=role_chances, preferred_roles=preferred_roles)
+
+    def roster(self, size):
+        """
+        :param size: Number of players
+        :return: List of synthetic player objects
+        """
+        return [self.player() for _ in range(size)]
+
+
+def autofill_count(match):
+    """
+    Counts players placed outside their preferred roles, using the same rule as the (auto) tag of MatchMaker
+    :param match: MatchMaker object
+    :return: int number of auto-filled players
+    """
+    return sum(1 for role, players in match.assignments.items() for p in players
+               if role not in p.preferred_roles and p.preferred_roles[0] != "flex")
+
+
+def run_algorithm(algorithm, roster, seed):
+    """
+    Runs one algorithm on one roster
+    :param algorithm: Name in ALGORITHMS
+    :param roster: List of player objects
+    :param seed: Seed for algorithms that use one
+    :return: List of resulting MatchMaker objects
+    """
+    if algorithm == "lobby":
+        return LobbyMaker(roster).lobbies
+    if algorithm == "monte_carlo":
+        return [MatchMaker(roster, mode="monte_carlo", seed=seed)]
+    return [MatchMaker(roster, mode=algorithm)]
+
+
+def benchmark(algorithm, size, runs, rosters):
+    """
+    Runs an algorithm on a fresh roster many times and summarizes speed and fairness
+    :param algorithm: Name in ALGORITHMS
+    :param size: Number of players per roster
+    :param runs: Number of rosters to run
+    :param rosters: SyntheticRosters object to draw rosters from
+    :return: dict of metrics
+    """
+    latencies = []
+    diffs = []
+    autofilled = 0
+    seated = 0
+    for run in range(runs):
+        roster = rosters.roster(size)
+        start = time.perf_counter()
+        # balance_roles prints every run, keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            matches = run_algorithm(algorithm, roster, run)
+        latencies.append((time.perf_counter() - start) * 1000)
+        for match in matches:
+            diffs.append(abs(match.best_match_diff))
+            autofilled += autofill_count(match)
+            seated += 10
+    latency = np.percentile(latencies, [50, 90, 99])
+    return dict(algorithm=algorithm, players=size, runs=runs,
+                latency_p50_ms=round(float(latency[0]), 3), latency_p90_ms=round(float(latency[1]), 3),
+                latency_p99_ms=round(float(latency[2]), 3),
+                abs_diff_mean=round(float(np.mean(diffs)), 3), abs_diff_p90=round(float(np.percentile(diffs, 90)), 3),
+                abs_diff_max=round(float(np.max(diffs)), 3), autofill_rate=round(autofilled / seated, 4))
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares results with a saved baseline
+    :param results: List of metric dicts from benchmark
+    :param baseline: List of metric dicts loaded from an earlier run
+    :param tolerance: Allowed relative growth of a metric, i.e. 0.2 for 20%
+    :return: List of str descriptions of every regression found
+    """
+    old_results = {(r["algorithm"], r["players"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = old_results.get((result["algorithm"], result["players"]))
+        if not old:
+            continue
+        for metric in REGRESSION_METRICS:
+            # small absolute slack so values near 0 don't flag on noise
+            if result[metric] > old[metric] * (1 + tolerance) + 0.01:
+                regressions.append(f"{result['algorithm']} with {result['players']} players: "
+                                   f"{metric} went from {old[metric]} to {result[metric]}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark speed and fairness of team generation")
+    parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 30, 100])
+    parser.add_argument("--runs", type=int, default=1000, help="rosters per algorithm and size")
+    parser.add_argument("--source", default="known_players.json", help="stored players to base rosters on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="json file to save results to")
+    parser.add_argument("--baseline", help="json file of earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for algorithm in args.algorithms:
+            if algorithm != "lobby" and size != 10:
+                continue
+            result = benchmark(algorithm, size, args.runs, SyntheticRosters(args.source, args.seed))
+            results.append(result)
+            print(f"{algorithm:>12} {size:>5} players | latency p50 {result['latency_p50_ms']:>9.3f} ms "
+                  f"p90 {result['latency_p90_ms']:>9.3f} ms p99 {result['latency_p99_ms']:>9.3f} ms | "
+                  f"|diff| mean {result['abs_diff_mean']:.2f} p90 {result['abs_diff_p90']:.2f} "
+                  f"max {result['abs_diff_max']:.2f} | auto-fill {result['autofill_rate']:.1%}")
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=4)
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            raise SystemExit(1)
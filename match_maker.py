@@ -1,25 +1,71 @@
 import random
 from collections import deque, Counter
 
+import numpy as np
+
+import match_solver
+from pair_cache import pair_cache, make_key
 from player import Player
 
+# Grid position of each player as (role, side), side 0 is team 1; matches the swap buttons on display_teams.html
+SLOTS = [(role, side) for role in match_solver.ROLES for side in range(2)]
+
+
+def merge_lane_weights(lane_weights=None):
+    """
+    :param lane_weights: Optional dict of role to how much that lane counts, roles left out keep the default
+    :return: dict of every role in match_solver.ROLES to its weight
+    """
+    unknown_roles = set(lane_weights or dict()) - set(match_solver.ROLES)
+    if unknown_roles:
+        raise ValueError(f"Unknown roles in lane_weights: {sorted(unknown_roles)}")
+    return {**dict(zip(match_solver.ROLES, match_solver.LANE_WEIGHTS)), **(lane_weights or dict())}
+
 
 class MatchMaker:
-    # TODO currently match_maker assumes exactly 10 players, fix this and let it create multiple teams
-    def __init__(self, player_list):
+    # match_maker assumes exactly 10 players, LobbyMaker splits larger pools into multiple MatchMakers
+    def __init__(self, player_list, mode="exact", assignments=None, option_count=1, seed=None, lane_weights=None,
+                 options=None):
         """
         Creates a set of 'balanced' teams from given set of players
-        :param player_list: List of player objects (currently accepts exactly 10 only)
+        :param player_list: List of player objects (currently accepts exactly 10 only, see LobbyMaker for more)
+        :param mode: "exact" finds the provably best matchup with match_solver, "monte_carlo" keeps the best of many
+        batched random trials, "random" uses the faster semi-randomized role balancing; exact and monte_carlo fall
+        back to random if they can't be used
+        :param assignments: Optional dict of role to [team 1 player, team 2 player] that is used as is,
+        i.e. lobbies already balanced by LobbyMaker
+        :param option_count: Number of distinct matchups the exact solver keeps in self.options, best first
+        :param seed: Seed used by the monte_carlo mode so results can be reproduced
+        :param lane_weights: Optional dict of role to how much that lane counts when balancing teams, i.e. raise
+        jungle for jungle impact; roles left out keep the default, which averages adc and supp into bot lane
+        :param options: Optional list of (assignments, cost) tuples, best first, that is used as is, i.e. the options
+        found by a TeamJob
         """
-        self.pair_cache = dict()
         self.players = player_list
+        self.mode = mode
+        self.lane_weights = merge_lane_weights(lane_weights)
+        solver_weights = np.array([self.lane_weights[role] for role in match_solver.ROLES])
         self.assignments = dict(top=[], jungle=[], mid=[], adc=[], supp=[])
-        self.balance_roles()
-        self.lane_diffs = self.calc_lane_diffs()
-        self.best_match_diff = self.calc_match_diff()
-        self.balance_teams()
-        self.lane_diffs = self.calc_lane_diffs()
-        self.best_match_diff = self.calc_match_diff()
+        self.match_cost = None
+        # List of (assignments, cost) tuples that select_option can switch between without searching again
+        self.options = []
+        self.option_index = 0
+        if options:
+            self.options = list(options)
+        elif assignments:
+            self.options = [(assignments, None)]
+        elif self.mode == "exact" and len(self.players) == 10:
+            self.options = match_solver.solve_top_k(self.players, option_count, lane_weights=solver_weights)
+        elif self.mode == "monte_carlo" and len(self.players) == 10:
+            assignments, cost, _ = match_solver.solve_monte_carlo(self.players, seed=seed, lane_weights=solver_weights)
+            self.options = [(assignments, cost)]
+        else:
+            self.balance_roles()
+            self.lane_diffs = self.calc_lane_diffs()
+            self.best_match_diff = self.calc_match_diff()
+            self.balance_teams()
+            self.options = [(self.assignments, None)]
+        self.select_option(0)
 
     def __str__(self):
         """
@@ -38,6 +84,18 @@ class MatchMaker:
         output += f"Total Match Diff: {self.best_match_diff}"
         return output
 
+    def select_option(self, index):
+        """
+        Switches the current matchup to one of the stored options; swaps made on an option are not kept
+        :param index: Index into self.options, 0 is the best
+        :return:
+        """
+        assignments, self.match_cost = self.options[index]
+        self.option_index = index
+        self.assignments = {role: list(pair) for role, pair in assignments.items()}
+        self.lane_diffs = self.calc_lane_diffs()
+        self.best_match_diff = self.calc_match_diff()
+
     def balance_roles(self):
         """
         Determines roles for each player using a semi-randomized customizable algorithm
@@ -46,10 +104,11 @@ class MatchMaker:
         loser_count = Counter()
         # Random shuffle players for fairness as final tie-break is who was placed first
         queue = deque(random.sample([p for p in self.players], len(self.players)))
+        role_chances = {player: dict(player.role_chances) for player in self.players}
         while queue:
             player = queue.popleft()
-            role_choices = list(player.role_chances.keys())
-            role_weights = list(player.role_chances.values())
+            role_choices = list(role_chances[player].keys())
+            role_weights = list(role_chances[player].values())
             role = random.choices(role_choices, role_weights, k=1)[0]
             if len(self.assignments[role]) >= 2:
                 player_group = self.get_best_pair(role, [self.assignments[role][0], self.assignments[role][1], player])
@@ -64,52 +123,45 @@ class MatchMaker:
     def balance_teams(self):
         """
         This function assumes self.assignments is full, and uses the lane values to swap players
-        within each role to get the total match diff as close to 0 as possible
+        within each role to get the weighted total match diff as close to 0 as possible
         :return:
         """
-        # This problem is recorded as np-complete, so I will just use exhaustive search as there are only 5 roles
-        optimize_swaps = [role for role in ["top", "jungle", "mid", "adc", "supp"]]
-        swap_sequences = [[[role] for role in optimize_swaps]]
-        for gen in range(3):
-            new_list = []
-            for seq in swap_sequences[gen]:
-                for role in optimize_swaps:
-                    if role not in seq:
-                        new_seq = sorted(seq+[role])
-                        if new_seq not in new_list:
-                            new_list.append(new_seq)
-            swap_sequences.append(new_list)
-        best_swaps = []
-        best_sum = self.best_match_diff
-        for gen in swap_sequences:
-            for swap_list in gen:
-                swap_value = sum([-1*self.lane_diffs[lane] if lane in swap_list else self.lane_diffs[lane]
-                                  for lane in ['top', 'mid', 'jungle']])
-                # values for bot and supp need to be averaged
-                bot_swap_value = sum([-1*self.lane_diffs[lane] if lane in swap_list else self.lane_diffs[lane]
-                                  for lane in ['adc', 'supp']]) / 2
-                swap_value += bot_swap_value
-                # want to find if target + swap_value closest to 0
-                if abs(swap_value) < abs(best_sum):
-                    best_sum = swap_value
-                    best_swaps = swap_list
-        for swap in best_swaps:
-            self.assignments[swap] = self.assignments[swap][::-1]
+        # This problem is recorded as np-complete, but with one bit per lane every combination of flips can be
+        # walked in gray code order, so each step flips a single lane and only that lane's value changes
+        lanes = list(self.assignments)
+        values = [self.lane_weights[lane] * self.calc_lane_diff(lane) for lane in lanes]
+        total = sum(values)
+        best_sum, best_mask, mask = total, 0, 0
+        # The first lane is never flipped as flipping every lane gives the same match
+        for step in range(1, 2 ** (len(lanes) - 1)):
+            lane = (step & -step).bit_length()
+            mask ^= 1 << lane
+            total -= 2 * values[lane]
+            values[lane] = -values[lane]
+            if abs(total) < abs(best_sum):
+                best_sum, best_mask = total, mask
+        for i, lane in enumerate(lanes):
+            if best_mask >> i & 1:
+                self.assignments[lane] = self.assignments[lane][::-1]
 
     def calc_lane_diffs(self):
         """
         Calculates the difference in scores for each lane, combines bot lane for more accurate measure of impact
         :return: The calculated differences in the form of a dictionary
         """
-        lane_diffs = dict(top=0, jungle=0, mid=0, adc=0, supp=0, bot=0)
-        for lane in lane_diffs:
-            if lane != "bot":
-                lane_diffs[lane] = round(self.assignments[lane][1].role_ranks[lane] - self.assignments[lane][0].role_ranks[lane], 2)
-            else:
-                team2 = (self.assignments["adc"][1].role_ranks["adc"] + self.assignments["supp"][1].role_ranks["supp"])/2
-                team1 = (self.assignments["adc"][0].role_ranks["adc"] + self.assignments["supp"][0].role_ranks["supp"])/2
-                lane_diffs["bot"] = round(team2 - team1, 2)
-        return lane_diffs
+        return {lane: self.calc_lane_diff(lane) for lane in ["top", "jungle", "mid", "adc", "supp", "bot"]}
+
+    def calc_lane_diff(self, lane):
+        """
+        Calculates the difference in scores for a single lane
+        :param lane: A role in self.assignments or "bot" for the average of adc and supp
+        :return: The rounded difference, positive means team 2 is higher ranked
+        """
+        if lane != "bot":
+            return round(self.assignments[lane][1].role_ranks[lane] - self.assignments[lane][0].role_ranks[lane], 2)
+        team2 = (self.assignments["adc"][1].role_ranks["adc"] + self.assignments["supp"][1].role_ranks["supp"])/2
+        team1 = (self.assignments["adc"][0].role_ranks["adc"] + self.assignments["supp"][0].role_ranks["supp"])/2
+        return round(team2 - team1, 2)
 
     def calc_match_diff(self):
         """
@@ -118,31 +170,95 @@ class MatchMaker:
         """
         return round(sum(self.lane_diffs[lane] for lane in self.lane_diffs if lane != "adc" and lane != "supp"), 2)
 
+    def swap_players(self, slot_a, slot_b):
+        """
+        Swaps two players, only the lanes they play in are recalculated and the match diff is updated by their change
+        :param slot_a: (role, side) of the first player, side 0 is team 1
+        :param slot_b: (role, side) of the second player
+        :return:
+        """
+        (role_a, side_a), (role_b, side_b) = slot_a, slot_b
+        temp = self.assignments[role_a][side_a]
+        self.assignments[role_a][side_a] = self.assignments[role_b][side_b]
+        self.assignments[role_b][side_b] = temp
+        # Only top, jungle, mid and bot count towards the match diff, adc and supp are part of bot
+        changed = {"bot" if role in ["adc", "supp"] else role for role in [role_a, role_b]}
+        old_diff = sum(self.lane_diffs[lane] for lane in changed)
+        for role in {role_a, role_b}:
+            self.lane_diffs[role] = self.calc_lane_diff(role)
+        if "bot" in changed:
+            self.lane_diffs["bot"] = self.calc_lane_diff("bot")
+        self.best_match_diff = round(self.best_match_diff - old_diff + sum(self.lane_diffs[lane] for lane in changed), 2)
+        self.match_cost = None
+
+    def rank_swaps(self, preference_weight=match_solver.PREFERENCE_WEIGHT,
+                   lane_diff_weight=match_solver.LANE_DIFF_WEIGHT):
+        """
+        Scores all 45 pairwise swaps of the current lineup in one vectorized pass, using the match_solver cost
+        :param preference_weight: Weight of role preferences against rank differences
+        :param lane_diff_weight: Weight of individual lane differences against the total match diff
+        :return: tuple of (cost of the current lineup, list of swaps best first), each swap is a dict with the slot
+        indexes and names of both players and the resulting match diff and cost
+        """
+        slot_players = [self.assignments[role][side] for role, side in SLOTS]
+        ranks, preference = match_solver.score_matrices(slot_players)
+        slot_roles = np.repeat(np.arange(5), 2)
+        # team 1 counts against the match diff and team 2 towards it
+        slot_weights = np.array([self.lane_weights[role] for role, _ in SLOTS]) * np.tile([-1, 1], 5)
+        # value[s, p] and pref[s, p] are what player p adds to the match diff and preference cost in slot s
+        value = slot_weights[:, None] * ranks[:, slot_roles].T
+        pref = preference[:, slot_roles].T
+        first, second = np.triu_indices(10, 1)
+        # Row 0 is the current lineup, every other row is one swap
+        rows = np.arange(1, len(first) + 1)
+        contributions = np.tile(np.diag(value), (len(first) + 1, 1))
+        contributions[rows, first] = value[first, second]
+        contributions[rows, second] = value[second, first]
+        pref_costs = np.tile(np.diag(pref), (len(first) + 1, 1))
+        pref_costs[rows, first] = pref[first, second]
+        pref_costs[rows, second] = pref[second, first]
+
+        lanes = contributions.reshape(-1, 5, 2).sum(axis=2)
+        match_diffs = lanes.sum(axis=1)
+        lane_costs = np.abs(lanes[:, :3]).sum(axis=1) + np.abs(lanes[:, 3] + lanes[:, 4])
+        costs = preference_weight * pref_costs.sum(axis=1) + np.abs(match_diffs) + lane_diff_weight * lane_costs
+
+        swaps = []
+        for i in np.argsort(costs[1:], kind="stable"):
+            swaps.append(dict(players=[int(first[i]), int(second[i])],
+                              names=[slot_players[first[i]].name, slot_players[second[i]].name],
+                              match_diff=round(float(match_diffs[i + 1]), 2), cost=round(float(costs[i + 1]), 2)))
+        return round(float(costs[0]), 2), swaps
+
     def get_best_pair(self, role: str, players: list[Player]) -> list[Player]:
         """
         Upon input of three of more players, returns in order the most optimal player for the given role
         Takes into account lane preferences and player skill, but heavily prefers lane preferences
-        Stores deterministic calls into memory to save time
+        Stores deterministic calls in the shared pair_cache so they are reused by later MatchMakers
         :param role: Must be a valid role in self.role_ranks
         :param players: List of three or more players
         :return: List of all original inputted players in order of fit for the role. The last player is always worst
         """
         # Players will be cached only if get_best_pair ends in a deterministic outcome, i.e. based on score
-        if tuple(sorted(players, key=lambda x: x.name)) in self.pair_cache:
-            return self.pair_cache[tuple(sorted(players, key=lambda x: x.name))]
-        shuffled = random.sample(players, len(players))
+        key, ordered = make_key(role, players)
+        cached = pair_cache.get(key)
+        if cached is not None:
+            return [ordered[i] for i in cached]
         # Find the player who has the role at lowest priority, if ties sort by scores
+        preferred = {player: player.preferred_roles for player in players}
         for i in range(5):
-            roles = []
-            for idx, player in enumerate(shuffled):
-                if i >= len(player.preferred_roles):
-                    return shuffled[:idx] + shuffled[idx + 1:] + [shuffled[idx]]
-                roles.append(player.preferred_roles[i])
-            roles = [player.preferred_roles[i] for player in shuffled]
-            if role in roles:
-                for idx, player_role in enumerate(roles):
-                    if role != player_role:
-                        return shuffled[:idx] + shuffled[idx+1:] + [shuffled[idx]]
+            # Players who ran out of preferred roles lose first, then those without the role at this priority
+            losers = [player for player in players if i >= len(preferred[player])]
+            if not losers and role in [preferred[player][i] for player in players]:
+                losers = [player for player in players if preferred[player][i] != role]
+            if len(losers) == 1:
+                # Only one possible loser is also a deterministic outcome
+                best_order = [player for player in ordered if player is not losers[0]] + losers
+                pair_cache.put(key, tuple(ordered.index(player) for player in best_order))
+                return best_order
+            if losers:
+                loser = random.choice(losers)
+                return [player for player in random.sample(players, len(players)) if player is not loser] + [loser]
         score_map = {player: dict() for player in players}
         for player in score_map:
             for other_player in [p for p in players if p != player]:
@@ -162,8 +278,9 @@ class MatchMaker:
         for pair in best_pairs:
             best_players[pair[1]] += 1
             best_players[pair[2]] += 1
-        self.pair_cache[tuple(sorted(players, key=lambda x: x.name))] = [counts[0] for counts in best_players.most_common()]
-        return [counts[0] for counts in best_players.most_common()]
+        best_order = [counts[0] for counts in best_players.most_common()]
+        pair_cache.put(key, tuple(ordered.index(player) for player in best_order))
+        return best_order
 
 
 if __name__ == '__main__':
@@ -0,0 +1,364 @@
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+"""
+Exact solver for a 10 player match
+Every way to pair players into the five roles is enumerated once as a NumPy array, each pairing is scored against
+a player x role score matrix and only pairings whose side independent cost can still beat the best found so far have
+their side flips resolved
+"""
+
+ROLES = ["top", "jungle", "mid", "adc", "supp"]
+# Bot lane is the average of adc and supp, so each of those lanes counts for half in the match diff
+LANE_WEIGHTS = np.array([1, 1, 1, 0.5, 0.5])
+# Cost of placing a player one step further down their preferred roles, measured in rank points (0-36 scale)
+PREFERENCE_WEIGHT = 3
+# Cost of each rank point of difference inside a single lane, keeps lanes even instead of only the total
+LANE_DIFF_WEIGHT = 0.25
+
+# Number of players that must change roles between two options of solve_top_k
+MIN_ROLE_CHANGES = 4
+# solve_top_k keeps this many candidates per requested option to choose diverse options from
+DIVERSITY_POOL = 20
+# Number of pairings solve_top_k scores at a time before checking if the rest can be pruned
+SEARCH_CHUNK = 4096
+# Defaults of solve_monte_carlo, the time budget is in seconds and keeps it inside a web request
+MONTE_CARLO_TRIALS = 20000
+MONTE_CARLO_TIME_BUDGET = 0.25
+MONTE_CARLO_BATCH = 2000
+
+_role_partitions = None
+_role_labels = None
+_side_signs = None
+
+
+def preference_cost(player, role):
+    """
+    Calculates how far down a players preferred roles a role is
+    Roles not listed are treated as flex, and if a player has no flex they are treated as one step past their last role
+    :param player: Player object
+    :param role: Role in ROLES
+    :return: int cost, 0 means the players main role
+    """
+    if role in player.preferred_roles:
+        return player.preferred_roles.index(role)
+    if "flex" in player.preferred_roles:
+        return player.preferred_roles.index("flex")
+    return len(player.preferred_roles)
+
+
+def score_matrices(players):
+    """
+    Builds the player x role matrices the solver scores against
+    Players that share a PlayerPool are read straight from its arrays
+    :param players: List of player objects
+    :return: tuple of (ranks, preference) float arrays, each of shape (len(players), 5)
+    """
+    pool = players[0].pool
+    if all(player.pool is pool for player in players):
+        ids = [player.player_id for player in players]
+        return pool.rank_matrix(ids), pool.preference_costs(ids)
+    ranks = np.array([[player.role_ranks[role] for role in ROLES] for player in players], dtype=float)
+    preference = np.array([[preference_cost(player, role) for role in ROLES] for player in players], dtype=float)
+    return ranks, preference
+
+
+def chance_matrix(players):
+    """
+    :param players: List of player objects
+    :return: array of shape (len(players), 5) of each players chance to play each role
+    """
+    pool = players[0].pool
+    if all(player.pool is pool for player in players):
+        return pool.chance_matrix([player.player_id for player in players])
+    return np.array([[player.role_chances.get(role, 0) for role in ROLES] for player in players], dtype=float)
+
+
+def role_partitions():
+    """
+    Lists every way to split 10 players into 5 unordered pairs, one pair per role
+    This is the same for every roster of 10 so it is only built once
+    :return: int array of shape (113400, 5, 2), [k, r] holds the two player indexes placed in role r
+    """
+    global _role_partitions
+    if _role_partitions is None:
+        # 945 ways to pair up 10 players, each pairing can be handed out to the roles in 120 orders
+        matchings = []
+
+        def add_pairs(remaining, pairs):
+            if not remaining:
+                matchings.append(pairs)
+                return
+            first = remaining[0]
+            for second in remaining[1:]:
+                add_pairs([p for p in remaining[1:] if p != second], pairs + [(first, second)])
+
+        add_pairs(list(range(10)), [])
+        role_orders = np.array(list(itertools.permutations(range(5))))
+        _role_partitions = np.array(matchings, dtype=np.int8)[:, role_orders].reshape(-1, 5, 2)
+    return _role_partitions
+
+
+def role_labels():
+    """
+    Lists the role of every player in each pairing of role_partitions()
+    :return: int array of shape (113400, 10), [k, p] is the index in ROLES of player p's role
+    """
+    global _role_labels
+    if _role_labels is None:
+        parts = role_partitions()
+        _role_labels = np.empty((len(parts), 10), dtype=np.int8)
+        rows = np.arange(len(parts))[:, None]
+        _role_labels[rows, parts[:, :, 0]] = np.arange(5)
+        _role_labels[rows, parts[:, :, 1]] = np.arange(5)
+    return _role_labels
+
+
+def side_signs():
+    """
+    Lists every way to put each lane pair on a side; top is fixed as a full flip of sides gives the same match
+    :return: array of shape (16, 5), 1 keeps the pair order (first player on team 1), -1 flips it
+    """
+    global _side_signs
+    if _side_signs is None:
+        flips = (np.arange(16)[:, None] >> np.arange(4)) & 1
+        _side_signs = np.hstack([np.ones((16, 1)), 1 - 2 * flips])
+    return _side_signs
+
+
+def matchup_costs(players, preference_weight=PREFERENCE_WEIGHT, lane_diff_weight=LANE_DIFF_WEIGHT,
+                  lane_weights=LANE_WEIGHTS):
+    """
+    Scores every role pairing of exactly 10 players
+    Cost of a matchup is preference_weight * sum of preference costs + |match diff| + lane_diff_weight * sum of
+    |lane diffs| (bot lane counted once, averaged like calc_lane_diffs)
+    :param players: List of exactly 10 player objects
+    :param preference_weight: Weight of role preferences against rank differences
+    :param lane_diff_weight: Weight of individual lane differences against the total match diff
+    :param lane_weights: Weight of each lane in ROLES order in the match diff, adc and supp make up bot lane
+    :return: tuple of (bound, full_costs) where bound is the side independent lower bound of every pairing and
+    full_costs(idx) returns the (len(idx), 16) costs of the given pairings for every side flip in side_signs()
+    """
+    if len(players) != 10:
+        raise ValueError(f"Exact solver needs exactly 10 players, got {len(players)}")
+    ranks, preference = score_matrices(players)
+    parts = role_partitions()
+    lanes = np.arange(5)
+    first, second = parts[:, :, 0], parts[:, :, 1]
+    pref_cost = preference[first, lanes].sum(axis=1) + preference[second, lanes].sum(axis=1)
+    weighted_diffs = (ranks[second, lanes] - ranks[first, lanes]) * lane_weights
+
+    # Lower bound of each pairing, match diff and bot diff can only add to it once sides are picked
+    bound = preference_weight * pref_cost + lane_diff_weight * np.abs(weighted_diffs[:, :3]).sum(axis=1)
+    signs = side_signs()
+
+    def full_costs(idx):
+        match_diffs = weighted_diffs[idx] @ signs.T
+        bot_diffs = weighted_diffs[idx, 3:] @ signs[:, 3:].T
+        return bound[idx, None] + np.abs(match_diffs) + lane_diff_weight * np.abs(bot_diffs)
+
+    return bound, full_costs
+
+
+def to_assignments(players, partition, side):
+    """
+    Converts a role pairing and side flip back into players
+    :param players: List of the 10 player objects that were scored
+    :param partition: Index into role_partitions()
+    :param side: Index into side_signs()
+    :return: dict of role to [team 1 player, team 2 player]
+    """
+    parts = role_partitions()
+    signs = side_signs()
+    assignments = dict()
+    for r, role in enumerate(ROLES):
+        pair = [players[parts[partition, r, 0]], players[parts[partition, r, 1]]]
+        assignments[role] = pair if signs[side, r] > 0 else pair[::-1]
+    return assignments
+
+
+def solve_exact(players, preference_weight=PREFERENCE_WEIGHT, lane_diff_weight=LANE_DIFF_WEIGHT,
+                lane_weights=LANE_WEIGHTS):
+    """
+    Finds the provably best roles and sides for exactly 10 players, see matchup_costs for how matchups are scored
+    :param players: List of exactly 10 player objects
+    :param preference_weight: Weight of role preferences against rank differences
+    :param lane_diff_weight: Weight of individual lane differences against the total match diff
+    :param lane_weights: Weight of each lane in ROLES order in the match diff
+    :return: tuple of (assignments dict of role to [team 1 player, team 2 player], cost of the matchup)
+    """
+    bound, full_costs = matchup_costs(players, preference_weight, lane_diff_weight, lane_weights)
+
+    # Incumbent is the pairing with the best bound, anything that can't beat it is pruned
+    incumbent = int(np.argmin(bound))
+    incumbent_costs = full_costs(np.array([incumbent]))[0]
+    side = int(np.argmin(incumbent_costs))
+    best_cost = incumbent_costs[side]
+    candidates = np.flatnonzero(bound < best_cost)
+    if candidates.size:
+        costs = full_costs(candidates)
+        k, candidate_side = np.unravel_index(np.argmin(costs), costs.shape)
+        if costs[k, candidate_side] < best_cost:
+            best_cost = costs[k, candidate_side]
+            incumbent, side = int(candidates[k]), int(candidate_side)
+    return to_assignments(players, incumbent, side), float(best_cost)
+
+
+def solve_top_k(players, k, min_role_changes=MIN_ROLE_CHANGES, preference_weight=PREFERENCE_WEIGHT,
+                lane_diff_weight=LANE_DIFF_WEIGHT, lane_weights=LANE_WEIGHTS, should_stop=None):
+    """
+    Finds the k best distinct matchups for exactly 10 players in a single search
+    Each role pairing only keeps its best side flip, so options are never side flips of each other, and options must
+    also move at least min_role_changes players into a different role than every better option
+    Pairings are searched in order of their lower bound and the search stops once no pairing left can enter the heap
+    :param players: List of exactly 10 player objects
+    :param k: Number of matchups to return
+    :param min_role_changes: Number of players whose role must differ between any two options
+    :param preference_weight: Weight of role preferences against rank differences
+    :param lane_diff_weight: Weight of individual lane differences against the total match diff
+    :param lane_weights: Weight of each lane in ROLES order in the match diff
+    :param should_stop: Optional function checked between chunks, returning True ends the search early with the best
+    options found so far, which are then no longer proven to be the best
+    :return: List of up to k (assignments, cost) tuples, best first
+    """
+    bound, full_costs = matchup_costs(players, preference_weight, lane_diff_weight, lane_weights)
+    order = np.argsort(bound, kind="stable")
+    # Keep more than k so options can still be dropped for being too similar
+    pool_size = k * DIVERSITY_POOL
+    # Max heap of (-cost, partition, side) holding the best pool_size pairings found so far
+    heap = []
+    for start in range(0, len(order), SEARCH_CHUNK):
+        idx = order[start:start + SEARCH_CHUNK]
+        if len(heap) == pool_size and bound[idx[0]] >= -heap[0][0]:
+            break
+        if start and should_stop and should_stop():
+            break
+        costs = full_costs(idx)
+        sides = np.argmin(costs, axis=1)
+        best = costs[np.arange(len(idx)), sides]
+        for i in np.argsort(best, kind="stable"):
+            if len(heap) < pool_size:
+                heapq.heappush(heap, (-best[i], int(idx[i]), int(sides[i])))
+            elif best[i] < -heap[0][0]:
+                heapq.heappushpop(heap, (-best[i], int(idx[i]), int(sides[i])))
+            else:
+                break
+
+    labels = role_labels()
+    options = []
+    chosen = []
+    for cost, partition, side in sorted(heap, key=lambda entry: (-entry[0], entry[1])):
+        if all((labels[partition] != labels[other]).sum() >= min_role_changes for other in chosen):
+            chosen.append(partition)
+            options.append((to_assignments(players, partition, side), float(-cost)))
+            if len(options) == k:
+                break
+    return options
+
+
+def solve_monte_carlo(players, trials=MONTE_CARLO_TRIALS, seed=None, time_budget=MONTE_CARLO_TIME_BUDGET,
+                      objective="cost", batch_size=MONTE_CARLO_BATCH, lane_weights=LANE_WEIGHTS, on_improve=None,
+                      should_stop=None):
+    """
+    Runs batches of randomized role assignments for exactly 10 players at once and keeps the best one
+    Every trial draws a random order of (player, role) choices weighted by role_chances and hands out roles in that
+    order until each role has two players, the best side flip of each trial is then picked like in the exact solver
+    :param players: List of exactly 10 player objects
+    :param trials: Max number of trials to run
+    :param seed: Seed of the random generator, the same seed and players give the same result as long as the trial
+    count runs out before the time budget
+    :param time_budget: Max seconds to spend, at least one batch is always run
+    :param objective: "cost" for the matchup_costs cost or "match_diff" for only |match diff|
+    :param batch_size: Number of trials run together in one set of array operations
+    :param lane_weights: Weight of each lane in ROLES order in the match diff
+    :param on_improve: Optional function called with (assignments, objective value, trials run) every time a batch
+    finds a better matchup, lets callers show the best result so far
+    :param should_stop: Optional function checked between batches, returning True ends the search early
+    :return: tuple of (assignments dict of role to [team 1 player, team 2 player], objective value, trials run)
+    """
+    if len(players) != 10:
+        raise ValueError(f"Monte Carlo solver needs exactly 10 players, got {len(players)}")
+    if objective not in ["cost", "match_diff"]:
+        raise ValueError(f"Unknown objective {objective}")
+    rng = np.random.default_rng(seed)
+    ranks, preference = score_matrices(players)
+    log_chances = np.log(np.maximum(chance_matrix(players), 0) + 1e-9).flatten()
+    signs = side_signs()
+    start = time.perf_counter()
+    best_value, best_seats, best_side = np.inf, None, None
+    run = 0
+    while run < trials and (run == 0 or time.perf_counter() - start < time_budget):
+        if run and should_stop and should_stop():
+            break
+        batch = min(batch_size, trials - run)
+        # Gumbel noise on the log chances gives a random order of choices, earlier is more likely for higher chances
+        keys = log_chances - np.log(-np.log(rng.random((batch, 50))))
+        order = np.argsort(-keys, axis=1)
+        labels = np.full((batch, 10), -1)
+        filled = np.zeros((batch, 5), dtype=int)
+        rows = np.arange(batch)
+        for step in range(50):
+            player, role = np.divmod(order[:, step], 5)
+            take = (labels[rows, player] == -1) & (filled[rows, role] < 2)
+            labels[rows[take], player[take]] = role[take]
+            filled[rows[take], role[take]] += 1
+
+        # Split the two players of each role into a first and second seat
+        seats = np.argsort(labels * 10 + np.arange(10), axis=1).reshape(batch, 5, 2)
+        lanes = np.arange(5)
+        weighted_diffs = (ranks[seats[:, :, 1], lanes] - ranks[seats[:, :, 0], lanes]) * lane_weights
+        values = np.abs(weighted_diffs @ signs.T)
+        if objective == "cost":
+            pref_cost = preference[seats[:, :, 0], lanes].sum(axis=1) + preference[seats[:, :, 1], lanes].sum(axis=1)
+            lane_costs = np.abs(weighted_diffs[:, :3]).sum(axis=1)[:, None] + np.abs(weighted_diffs[:, 3:] @ signs[:, 3:].T)
+            values += PREFERENCE_WEIGHT * pref_cost[:, None] + LANE_DIFF_WEIGHT * lane_costs
+        trial, side = np.unravel_index(np.argmin(values), values.shape)
+        run += batch
+        if values[trial, side] < best_value:
+            best_value, best_seats, best_side = values[trial, side], seats[trial], side
+            if on_improve:
+                on_improve(seats_to_assignments(players, best_seats, best_side), float(best_value), run)
+    return seats_to_assignments(players, best_seats, best_side), float(best_value), run
+
+
+def seats_to_assignments(players, seats, side):
+    """
+    Converts the seats of a Monte Carlo trial back into players
+    :param players: List of the 10 player objects that were scored
+    :param seats: int array of shape (5, 2) of the player indexes in each role
+    :param side: Index into side_signs()
+    :return: dict of role to [team 1 player, team 2 player]
+    """
+    signs = side_signs()
+    assignments = dict()
+    for r, role in enumerate(ROLES):
+        pair = [players[seats[r, 0]], players[seats[r, 1]]]
+        assignments[role] = pair if signs[side, r] > 0 else pair[::-1]
+    return assignments
+
+
+if __name__ == '__main__':
+    # Compares trial throughput of solve_monte_carlo with the per-player loop of MatchMaker.balance_roles
+    import contextlib
+    import io
+    import random
+    from lobby_maker import random_player
+    from match_maker import MatchMaker
+
+    random.seed(0)
+    roster = [random_player(f"player{i}#NA1") for i in range(10)]
+    loop_trials = 2000
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(loop_trials):
+            MatchMaker(roster, mode="random")
+    loop_rate = loop_trials / (time.perf_counter() - start)
+    start = time.perf_counter()
+    _, value, trials_run = solve_monte_carlo(roster, trials=200000, seed=0, time_budget=10)
+    batched_rate = trials_run / (time.perf_counter() - start)
+    print(f"balance_roles loop: {loop_rate:,.0f} trials/s")
+    print(f"solve_monte_carlo: {batched_rate:,.0f} trials/s ({batched_rate / loop_rate:.0f}x), best cost {value:.2f}")
+    print(f"solve_exact best cost {solve_exact(roster)[1]:.2f}")
@@ -1,19 +1,84 @@
+import threading
 import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+import requests
 import selenium.common.exceptions
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from collections import defaultdict
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from collections import Counter
+from driver_pool import DriverPool
+from opgg_http import OpggHttpClient, QUEUE_WEIGHTS, parse_pages
+from page_waits import PageNotReady, PageWaiter, document_complete, element_replaced
+
+
+# Scripts run in the browser that collect a whole tab at once, returning the same payloads as the opgg_http parsers
+# instead of one WebDriver round trip per element; XPaths match the ones used by opgg_http
+PAGE_HELPERS = """
+const all = (xpath, root) => {
+    const found = document.evaluate(xpath, root || document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    return Array.from({length: found.snapshotLength}, (_, i) => found.snapshotItem(i));
+};
+const text = element => element.innerText.trim();
+"""
+PROFILE_SCRIPT = PAGE_HELPERS + """
+let currentRank = null;
+const soloQueue = all("//span[text()='Ranked Solo/Duo']/..")[0];
+if (soloQueue) {
+    if (soloQueue.innerText.includes("Unranked")) {
+        currentRank = soloQueue.innerText.split("\\n")[1];
+    } else {
+        const tier = all("..//div[@class='tier']", soloQueue)[0];
+        currentRank = tier ? text(tier) : null;
+    }
+}
+const rankList = all("//div[@id='content-container']//table[1]")[0];
+return {
+    current_rank: currentRank,
+    seasons: rankList ? all(".//b[@class='season']", rankList).map(text) : [],
+    past_ranks: rankList ? all(".//div[@class='rank-item']", rankList).map(text) : [],
+    mastery: all("//div[text() = 'Mastery']/..//strong[@class='champion-name']").map(m => m.textContent),
+};
+"""
+QUEUE_TAB_SCRIPT = PAGE_HELPERS + """
+return {
+    avg_tiers: Array.from(document.getElementsByClassName("avg-tier")).map(text),
+    summoner_names: all("//div[@class='summoner-tooltip']//span").map(p => p.textContent),
+    champs: all("//div[@class='inner']//div[@class='info']//a[@class='champion']//img").map(c => c.getAttribute("alt")),
+};
+"""
+
+
+def game_keys(tab):
+    """
+    Fingerprints every game of a queue tab so it can be recognised on a later scrape
+    op.gg doesn't show a game id, so a game is identified by its 10 summoner names and the players champ
+    :param tab: dict from opgg_http.parse_queue_tab or QUEUE_TAB_SCRIPT
+    :return: List of str keys, newest game first like the page
+    """
+    names = tab["summoner_names"]
+    return ["|".join(names[10 * i:10 * i + 10] + [champ or ""]) for i, champ in enumerate(tab["champs"])]
+
+
+# Named sets of scrape steps, so a refresh only pays for the tabs and queries it needs
+# update presses the Update button, ranks and mastery come from the profile page and games from the queue tabs
+SCRAPE_PROFILES = {
+    "full": {"update", "ranks", "mastery", "games"},
+    "ranks-only": {"update", "ranks", "mastery"},
+    "roles-only": {"update", "games"},
+}
 
 
 class OpggScraper:
     CURRENT_SEASON = "S2025 S1"
+    # Most recent game ranks kept per player once new games are merged into stored ones
+    MAX_GAME_RANKS = 40
 
-    def __init__(self, server="na", player_name="", link="", player_list=None, auto_scrape=False):
+    def __init__(self, server="na", player_name="", link="", player_list=None, auto_scrape=False, driver_pool=None,
+                 pool_size=4, backend="selenium", selenium_fallback=True, waiter=None,
+                 snapshots=None, history=None, scrape_profile="full", player_timeout=120.0, max_attempts=2):
         """
         Creates a scraper object that will open op.gg links and collect player information
         Only one of player_name, link, and player_list is required to add players to the scraper queue upon creation
@@ -22,6 +87,19 @@ class OpggScraper:
         :param link: The direct op.gg link of the player to add
         :param player_list: A list of players in tuple (server,player_name) or link form
         :param auto_scrape: Whether the scraper will start as soon as its made
+        :param driver_pool: Optional DriverPool shared with other scrapers, a new pool of pool_size is made if None
+        :param pool_size: Number of drivers, and players scraped at the same time, when no driver_pool is given
+        :param backend: "selenium" to scrape in Chrome, "http" to fetch and parse pages without a browser or "replay"
+        to re-parse the newest pages saved in snapshots without going online
+        :param selenium_fallback: Whether players the http backend fails to parse are scraped again with selenium
+        :param waiter: Optional PageWaiter shared with other scrapers, its timeouts adapt to how fast pages load
+        :param snapshots: Optional SnapshotStore every fetched page is saved to, required by the replay backend
+        :param history: Optional dict of player name to stored champs, game_ranks and last_games (see
+        StorageTool.get_history); only games newer than last_games are parsed and merged into the stored data
+        :param scrape_profile: Name in SCRAPE_PROFILES of the steps to run, i.e. "ranks-only" skips the queue tabs;
+        see players_from_scraper for merging partial results with stored players
+        :param player_timeout: Seconds a single attempt at a player may take before it is given up on
+        :param max_attempts: Times a failed player is tried, failures are re-queued behind the rest of the batch
         """
         self.link_map = dict()
         self.player_ranks = defaultdict(dict)
@@ -30,10 +108,37 @@ class OpggScraper:
         self.player_mastery = defaultdict(list)
         self.player_champs = defaultdict(
             lambda: dict(top=Counter(), jungle=Counter(), mid=Counter(), adc=Counter(), supp=Counter()))
-        driver_options = Options()
-        driver_options.add_argument('--blink-settings=imagesEnabled=false')
-        driver_options.add_argument('--disable-javascript')
-        self.driver = webdriver.Chrome(options=driver_options)
+        # Drivers are only started once scraping begins, a pool passed in is left open for its owner to close
+        self.owns_pool = driver_pool is None
+        self.driver_pool = driver_pool or DriverPool(size=pool_size)
+        self.backend = backend
+        self.selenium_fallback = selenium_fallback
+        self.http_client = OpggHttpClient(pool_size=2 * pool_size) if backend == "http" else None
+        self.waiter = waiter or PageWaiter()
+        self.snapshots = snapshots
+        if scrape_profile not in SCRAPE_PROFILES:
+            raise ValueError(f"Unknown scrape profile {scrape_profile}, use one of {list(SCRAPE_PROFILES)}")
+        self.scrape_profile = scrape_profile
+        self.steps = SCRAPE_PROFILES[scrape_profile]
+        if backend == "replay" and snapshots is None:
+            raise ValueError("The replay backend needs a SnapshotStore to read pages from")
+        self.player_timeout = player_timeout
+        self.max_attempts = max_attempts
+        # Result of the last attempt at each player, see scrape
+        self.results = dict()
+        # Players whose last attempt failed, mapped to the reason
+        self.failed_players = dict()
+        # Steps finished per player in the current attempt, used to tell ok from partial results
+        self.completed = defaultdict(set)
+        # Deadline of the player each worker thread is scraping
+        self.local = threading.local()
+        self.history = history or dict()
+        # Key of the newest game seen per player and queue, see game_keys
+        self.last_seen_games = defaultdict(dict)
+        # Number of games that were new in the last scrape of each player
+        self.new_games = Counter()
+        # Seconds spent in each stage of a scrape, one entry per player or tab, see timed
+        self.stage_times = defaultdict(list)
 
         if player_name:
             self.add_player_by_name(server, player_name)
@@ -47,11 +152,22 @@ class OpggScraper:
 
     def scrape_all(self):
         """
-        Scrapes each player one at a time
-        :return:
-        """
-        for player in self.link_map:
-            self.scrape(player, self.link_map[player])
+        Scrapes players in parallel, one per driver in the pool, so a roster takes about as long as its slowest profiles
+        A failed player is re-queued behind the rest of the batch until it has been tried max_attempts times
+        :return: dict of player name to the result of their last attempt, see scrape
+        """
+        workers = self.http_client.pool_size if self.http_client else self.driver_pool.size
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(self.scrape, player, link): player for player, link in self.link_map.items()}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    player = pending.pop(future)
+                    result = future.result()
+                    if result["status"] == "failed" and result["attempts"] < self.max_attempts:
+                        print(f"Re-queueing {player} after attempt {result['attempts']} failed: {result['reason']}")
+                        pending[executor.submit(self.scrape, player, self.link_map[player])] = player
+        return self.results
 
     def add_player_by_name(self, server: str, player_name: str):
         """
@@ -102,43 +218,277 @@ class OpggScraper:
 
     def scrape(self, player, link):
         """
-        Scrapes op.gg link using selenium web scraping
+        Makes one attempt at a player, any error is caught so it never stops the rest of a batch
+        :param player: name of the player to be scraped
+        :param link: link to the player's op.gg
+        :return: dict with status ("ok", "partial" if only some steps finished or "failed"), reason (None if ok),
+        attempts and seconds; also stored in self.results
+        """
+        start = time.time()
+        attempts = self.results.get(player, dict()).get("attempts", 0) + 1
+        self.local.deadline = start + self.player_timeout
+        self.completed[player] = set()
+        reason = None
+        try:
+            with self.timed("player"):
+                self.scrape_with_backend(player, link)
+        except Exception as e:
+            # WebDriverExceptions keep their message in msg, str() adds a "Message:" prefix and stacktrace
+            reason = f"{type(e).__name__}: {getattr(e, 'msg', None) or str(e).strip()}"
+        # The update button can't be pressed without a browser, so it never counts towards a complete result
+        wanted = self.steps & {"ranks", "mastery"}
+        if "games" in self.steps_for(player):
+            wanted |= set(QUEUE_WEIGHTS)
+        if wanted <= self.completed[player]:
+            status = "ok"
+        elif self.completed[player] & {"ranks", "mastery"} or self.completed[player] & set(QUEUE_WEIGHTS):
+            status = "partial"
+            reason = reason or "Some steps didn't finish"
+        else:
+            status = "failed"
+            reason = reason or "Nothing was scraped"
+        if status == "failed":
+            self.failed_players[player] = reason
+            print(f"Could not scrape {player}: {reason}")
+        else:
+            self.failed_players.pop(player, None)
+        self.results[player] = dict(status=status, reason=reason, attempts=attempts,
+                                    seconds=round(time.time() - start, 2))
+        return self.results[player]
+
+    def scrape_with_backend(self, player, link):
+        """
+        Scrapes op.gg link using the http backend if enabled, otherwise selenium on a driver checked out of the pool
         :param player: name of the player to be scraped
         :param link: link to the player's op.gg
         :return:
         """
-        self.driver.get(link)
-        WebDriverWait(self.driver, 5).until(
-            EC.presence_of_element_located((By.XPATH, "//button//span[text()='Update']"))
-        )
+        if self.backend == "replay":
+            self.scrape_replay(player)
+            return
+        if self.http_client:
+            try:
+                self.scrape_http(player, link)
+                return
+            except (requests.RequestException, ValueError) as e:
+                if not self.selenium_fallback:
+                    raise
+                print(f"Could not scrape {player} over http ({e}), falling back to selenium")
+                # Whatever the http attempt recorded is dropped so its games aren't merged in twice
+                self.completed[player] = set()
+                self.start_history(player)
+        error = None
+        with self.driver_pool.driver() as driver:
+            try:
+                self.scrape_with_driver(driver, player, link)
+            except PageNotReady as e:
+                # The driver itself is fine so it goes back to the pool, only this player is given up on
+                error = e
+        if error:
+            raise error
+
+    def deadline(self):
+        """
+        :return: time.time() the player scraped on this thread must be finished by, None outside of scrape
+        """
+        return getattr(self.local, "deadline", None)
+
+    @contextmanager
+    def timed(self, stage):
+        """
+        Records how long the block takes under stage in stage_times
+        :param stage: name of the stage, i.e. "load", "profile" or "tab_switch"
+        :return:
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[stage].append(time.perf_counter() - start)
+
+    def check_deadline(self, step):
+        """
+        Gives up on the current player if it is out of time
+        :param step: name of the next step, for the error message
+        :return:
+        """
+        if self.deadline() is not None and time.time() > self.deadline():
+            raise PageNotReady(f"Out of time before {step}")
+
+    def scrape_with_driver(self, driver, player, link):
+        """
+        Scrapes op.gg link on the given driver
+        :param driver: selenium driver not used by any other thread
+        :param player: name of the player to be scraped
+        :param link: link to the player's op.gg
+        :return:
+        """
+        if self.deadline() is not None:
+            driver.set_page_load_timeout(max(1.0, self.deadline() - time.time()))
+        with self.timed("load"):
+            driver.get(link)
+            self.waiter.wait(driver, "profile",
+                             EC.presence_of_element_located((By.XPATH, "//button//span[text()='Update']")),
+                             message=link, deadline=self.deadline())
 
         # Update profile if necessary
-        self.update_profile(self.driver)
+        if "update" in self.steps:
+            with self.timed("update"):
+                self.update_profile(driver)
+        self.save_snapshot(player, "profile", driver.page_source, link)
+
+        # Ranks, past ranks and mastery in one round trip
+        if self.steps & {"ranks", "mastery"}:
+            self.check_deadline("profile")
+            with self.timed("profile"):
+                profile = self.extract_profile(driver)
+            self.record_profile(player, profile)
+
+        # Avg elo, roles and champs of games since the last scrape of each queue, one round trip per tab
+        self.start_history(player)
+        for game_mode in QUEUE_WEIGHTS if "games" in self.steps_for(player) else []:
+            self.check_deadline(game_mode)
+            tab = self.extract_queue_tab(driver, game_mode)
+            if tab is None:
+                # The player has no games in this queue, nothing is missing
+                self.completed[player].add(game_mode)
+                continue
+            self.save_snapshot(player, game_mode, driver.page_source, driver.current_url)
+            with self.timed("record"):
+                self.record_queue_tab(player, tab, game_mode)
+
+    def scrape_http(self, player, link):
+        """
+        Scrapes op.gg link without a browser, the profile is not updated as that needs a button click
+        :param player: name of the player to be scraped
+        :param link: link to the player's op.gg
+        :return:
+        """
+        pages = self.http_client.fetch_pages(link, profile=bool(self.steps & {"ranks", "mastery"}),
+                                             queues=QUEUE_WEIGHTS if "games" in self.steps_for(player) else [])
+        for page, html in pages.items():
+            self.save_snapshot(player, page, html, link)
+        self.record_pages(player, pages)
 
-        # Scrape players current ranks
-        self.player_ranks[player] = self.get_current_player_ranks(self.driver)
+    def scrape_replay(self, player):
+        """
+        Re-parses the newest saved pages of a player without going online
+        :param player: name of the player to be scraped
+        :return:
+        """
+        pages = self.snapshots.latest_html(player, "opgg")
+        if "profile" not in pages:
+            raise ValueError("No saved profile page")
+        if not self.steps & {"ranks", "mastery"}:
+            del pages["profile"]
+        if "games" not in self.steps_for(player):
+            pages = {page: html for page, html in pages.items() if page not in QUEUE_WEIGHTS}
+        self.record_pages(player, pages)
 
-        # Scrape players past ranks
-        self.player_ranks[player].update(self.get_past_player_ranks(self.driver))
+    def record_pages(self, player, pages):
+        """
+        Parses and stores a profile and its queue tabs from raw html
+        :param player: name of the player
+        :param pages: dict of "profile" or queue type to str html
+        :return:
+        """
+        with self.timed("parse"):
+            profile, tabs = parse_pages(pages)
+        if profile:
+            self.record_profile(player, profile)
+        self.start_history(player)
+        for game_mode, tab in tabs.items():
+            self.record_queue_tab(player, tab, game_mode)
 
-        # Scrape champ mastery
-        self.player_mastery[player] = self.update_player_mastery(self.driver)
+    def steps_for(self, player):
+        """
+        Steps to run for a player, the queue tabs are scraped anyway if nothing of their games is stored yet, as a
+        profile that skips them would otherwise leave the player with no game ranks at all
+        :param player: name of the player
+        :return: set of steps from SCRAPE_PROFILES
+        """
+        if "games" not in self.steps and "last_games" not in self.history.get(player, dict()):
+            return self.steps | {"games"}
+        return self.steps
 
-        # Get avg elo of last 20 norm games
-        self.player_game_ranks[player] = self.recent_elo(self.driver, "NORMAL", player)
-        recent_game_roles = self.update_recent_roles(self.driver, "NORMAL", 1, player)
-        recent_champs = self.get_recent_champs(self.driver, "NORMAL")
+    def start_history(self, player):
+        """
+        Loads the stored champs, game ranks and newest seen games of a player so new games are merged into them
+        Also undoes the games recorded by an earlier attempt at the player
+        :param player: name of the player
+        :return:
+        """
+        history = self.history.get(player, dict())
+        # Without last_games every game is parsed again, so stored champs and ranks would be counted twice
+        if "last_games" not in history:
+            history = dict()
+        self.player_game_ranks[player] = list(history.get("game_ranks", []))
+        self.player_champs[player] = {role: Counter(history.get("champs", dict()).get(role, dict()))
+                                      for role in ["top", "jungle", "mid", "adc", "supp"]}
+        self.last_seen_games[player] = dict(history.get("last_games", dict()))
+        self.player_recent_roles[player] = Counter(top=0, jungle=0, mid=0, adc=0, supp=0)
+        self.new_games[player] = 0
+
+    def save_snapshot(self, player, page, html, url):
+        """
+        Saves a fetched page to the snapshot store if there is one
+        :param player: name of the player
+        :param page: "profile" or the queue type of the tab
+        :param html: str html of the page
+        :param url: url of the page
+        :return:
+        """
+        if self.snapshots is not None:
+            self.snapshots.put(player, "opgg", page, html, url)
 
-        # Get avg elo of last 20 ranked games
-        self.player_game_ranks[player].extend(self.recent_elo(self.driver, "SOLORANKED", player))
-        recent_game_roles.extend(self.update_recent_roles(self.driver, "SOLORANKED", 2,  player))
-        recent_champs.extend(self.get_recent_champs(self.driver, "NORMAL"))
-        for role, champ in zip(recent_game_roles, recent_champs):
+    def record_profile(self, player, profile):
+        """
+        Stores ranks and mastery parsed from a profile page
+        :param player: name of the player
+        :param profile: dict from opgg_http.parse_profile
+        :return:
+        """
+        if "ranks" in self.steps:
+            self.player_ranks[player] = {self.CURRENT_SEASON: profile["current_rank"]} if profile["current_rank"] else dict()
+            self.player_ranks[player].update(zip(profile["seasons"], profile["past_ranks"][1:]))
+        if "mastery" in self.steps:
+            self.player_mastery[player] = profile["mastery"]
+        self.completed[player].update(self.steps & {"ranks", "mastery"})
+
+    def record_queue_tab(self, player, tab, game_mode):
+        """
+        Merges the games of a queue tab played since the newest game seen before into average elos, roles and champs
+        Games are weighted by QUEUE_WEIGHTS, 1 for norm and 2 for ranked i.e. are ranked or norm games more important?
+        :param player: name of the player
+        :param tab: dict from opgg_http.parse_queue_tab
+        :param game_mode: queue type of the tab
+        :return: int number of new games
+        """
+        keys = game_keys(tab)
+        last_seen = self.last_seen_games[player].get(game_mode)
+        # Games are listed newest first, so everything before the last seen game is new
+        new_count = keys.index(last_seen) if last_seen in keys else len(keys)
+        if keys:
+            self.last_seen_games[player][game_mode] = keys[0]
+        self.player_game_ranks[player] = (tab["avg_tiers"][:new_count] +
+                                          self.player_game_ranks[player])[:self.MAX_GAME_RANKS]
+        mod_player_name = player.split("#")[0]
+        roles = ["supp", "top", "jungle", "mid", "adc"]
+        for i, champ in enumerate(tab["champs"][:new_count]):
+            game_names = tab["summoner_names"][10 * i:10 * i + 10]
+            if mod_player_name not in game_names:
+                continue
+            role = roles[((game_names.index(mod_player_name) + 1) % 10) % 5]
+            self.player_recent_roles[player][role] += QUEUE_WEIGHTS[game_mode]
             self.player_champs[player][role][champ] += 1
+        self.new_games[player] += new_count
+        self.completed[player].add(game_mode)
+        return new_count
 
     def update_profile(self, driver):
         """
         Presses the update button on a users profile if it has been more than one hour since the last update
+        and waits for op.gg to finish the update, raising PageNotReady if it never does
         :param driver: The currently in use selenium driver
         :return:
         """
@@ -147,59 +497,16 @@ class OpggScraper:
         # only click if it has been 1+ day since last update
         if 'Available' not in time_since_update and 'minute' not in time_since_update and 'hour' not in time_since_update:
             update_button.click()
-            while 'Available' not in time_since_update:
-                driver.implicitly_wait(0.1)
-                time_since_update = driver.find_element(by=By.CLASS_NAME, value="last-update").text
-
-    def update_player_mastery(self, driver):
-        """
-        Gathers champion mastery for a players most played champions
-        :param driver: The currently in use selenium driver
-        :return: returns list of most mastered champions
-        """
-        try:
-            mastery = driver.find_elements(by=By.XPATH, value="//div[text() = 'Mastery']/..//strong[@class='champion-name']")
-            mastery = [m.get_attribute('textContent') for m in mastery]
-            return mastery
-        except selenium.common.exceptions.NoSuchElementException:
-            return []
-
+            self.waiter.wait(driver, "update", EC.text_to_be_present_in_element((By.CLASS_NAME, "last-update"),
+                                                                                "Available"), deadline=self.deadline())
 
-    def get_current_player_ranks(self, driver):
+    def extract_profile(self, driver):
         """
-        Scrapes data regarding most recent player rank
+        Collects current rank, past ranks and mastery with a single script run in the browser
         :param driver: The currently in use selenium driver
-        :return: dict representing each players season mapped to their rank that season
+        :return: dict in the same form as opgg_http.parse_profile
         """
-        try:
-            rank = driver.find_element(by=By.XPATH, value="//span[text()='Ranked Solo/Duo']/..")
-            if "Unranked" in rank.text:
-                curr_ranks = rank.text.split("\n")
-                # print(f"Current rank in {curr_ranks[0]} is {curr_ranks[1]}")
-                return {self.CURRENT_SEASON: curr_ranks[1]}
-            else:
-                curr_rank = rank.find_element(by=By.XPATH, value="..//div[@class='tier']")
-                # print(f"Current rank in {i.text} is {curr_rank.text}")
-                return {self.CURRENT_SEASON: curr_rank.text}
-        except selenium.common.exceptions.NoSuchElementException:
-            return dict()
-
-    def get_past_player_ranks(self, driver):
-        """
-        Scrapes data regarding player ranks over time
-        :param driver: The currently in use selenium driver
-        :return: dict representing each players season mapped to their rank that season
-        """
-        try:
-            rank_list = driver.find_element(by=By.XPATH, value="//div[@id='content-container']//table[1]")
-
-            seasons = rank_list.find_elements(by=By.XPATH, value=".//b[@class='season']")
-            past_ranks = rank_list.find_elements(by=By.XPATH, value=".//div[@class='rank-item']")
-            ranks_by_season = {season.text: rank.text for season, rank in zip(seasons, past_ranks[1:])}
-            return ranks_by_season
-
-        except selenium.common.exceptions.NoSuchElementException:
-            return dict()
+        return driver.execute_script(PROFILE_SCRIPT)
 
     def change_game_mode(self, driver, game_mode):
         """
@@ -212,6 +519,9 @@ class OpggScraper:
         start_url = driver.current_url
         if game_mode in start_url:
             return True
+        # op.gg swaps the games of a tab in place, so the new tab is watched for through the games shown before it
+        old_games = driver.find_elements(By.CLASS_NAME, "avg-tier")[:1]
+        tab_loaded = [element_replaced(game) for game in old_games]
         # First look for the button
         try:
             rank_button = driver.find_element(by=By.XPATH, value=f"//button[@value='{game_mode}']")
@@ -223,93 +533,45 @@ class OpggScraper:
                 rank_button.click()
             except selenium.common.exceptions.NoSuchElementException:
                 return False
-        # Wait until new page has loaded
-        WebDriverWait(driver, 5).until(
-            EC.url_contains(game_mode)
-        )
         # Based on the design of the website it is theoretically possible for nothing to change besides the url
-        # However a url change does not mean the page is fully loaded so need to manually sleep
-        # Tab shouldn't take this long to load but sleep for full second for safety
-        time.sleep(1)
+        # so a url change alone doesn't mean the tab has loaded; it has once its button shows as selected or the old
+        # games are gone, and when no games were shown there is nothing else to wait for
+        if tab_loaded:
+            tab_loaded.append(EC.presence_of_element_located((By.XPATH, (
+                f"//button[@value='{game_mode}'][@aria-selected='true' or @aria-pressed='true' or "
+                f"contains(concat(' ', @class, ' '), ' active ')]"))))
+        self.waiter.wait(driver, "tab", EC.all_of(EC.url_contains(game_mode), document_complete, *(
+            [EC.any_of(*tab_loaded)] if tab_loaded else [])), message=game_mode, deadline=self.deadline())
         return True
 
 
-    def update_recent_roles(self, driver, game_mode, mode_weight, curr_player_name):
-        """
-        Updates the amount of time a player has played a champion over the past twenty games within a game_mode
-        This function will re-run itself if the tab takes too long to update causing an error
-        :param driver: The currently in use selenium driver
-        :param game_mode: The game_mode tab to try and scrape
-        :param mode_weight: The amount of weight the games in this mode have, My code uses 1 for norm and 2 for ranked
-        i.e. are ranked or norm games more important?
-        :param curr_player_name: Name of the current player we are scraping
-        :return: Updates dict of player name to role and champions in place; returns empty list if failed
-        """
-        if not self.change_game_mode(driver, game_mode):
-            return []
-        try:
-            all_players = driver.find_elements(by=By.XPATH, value="//div[@class='summoner-tooltip']//span")
-            player_list = [p.get_attribute('textContent') for p in all_players]
-            mod_player_name = curr_player_name.split("#")[0]
-            player_locs = [((i+1) % 10) % 5 for i, p in enumerate(player_list) if p == mod_player_name]
-            # print(f"num {game_mode} games = {len(player_locs)}, total_players = {len(player_list)}")
-            roles = ["supp", "top", "jungle", "mid", "adc"]
-            recent_games = []
-            for game in player_locs:
-                recent_games.append(roles[game])
-                self.player_recent_roles[curr_player_name][roles[game]] += mode_weight
-            return recent_games
-        except selenium.common.exceptions.NoSuchElementException:
-            return []
-        except selenium.common.exceptions.StaleElementReferenceException:
-            return self.update_recent_roles(driver, game_mode, mode_weight, curr_player_name)
-
-    def recent_elo(self, driver, game_mode, player):
+    def extract_queue_tab(self, driver, game_mode):
         """
-        Scrapes average elo from the past twenty games
-        This function will re-run itself if the tab takes too long to update causing an error
+        Switches to a queue tab and collects avg elos, summoner names and champs of its recent games in one round trip
         :param driver: The currently in use selenium driver
-        :param game_mode: target game_mode name to scrape
-        :param player: The name of the current player
-        :return: List of elo values i.e. Gold 3, Bronze 1, etc.
+        :param game_mode: The game_mode tab to scrape
+        :return: dict in the same form as opgg_http.parse_queue_tab, None if the tab doesn't exist
         """
-        if not self.change_game_mode(driver, game_mode):
-            return []
-        try:
-            elo_list = driver.find_elements(by=By.CLASS_NAME, value="avg-tier")
-            return [e.text for e in elo_list]
-        except selenium.common.exceptions.NoSuchElementException:
-            return []
-        except selenium.common.exceptions.StaleElementReferenceException:
-            return self.recent_elo(driver, game_mode, player)
-
-    def get_recent_champs(self, driver, game_mode):
-        """
-        Scrapes and returns a list of the 20 most recent champs a player has played in a given game mode
-        :param driver: The currently in use selenium driver
-        :param game_mode: target game_mode name to scrape
-        :return:
-        """
-        if not self.change_game_mode(driver, game_mode):
-            return []
-        try:
-            champs = driver.find_elements(by=By.XPATH,
-                                          value="//div[@class='inner']//div[@class='info']//a[@class='champion']//img")
-            champs = [c.get_attribute("alt") for c in champs]
-            return champs
-        except selenium.common.exceptions.NoSuchElementException:
-            return []
+        with self.timed("tab_switch"):
+            if not self.change_game_mode(driver, game_mode):
+                return None
+        with self.timed("tab_extract"):
+            return driver.execute_script(QUEUE_TAB_SCRIPT)
 
     def quit_driver(self):
         """
-        Quits the driver to save resources
+        Quits the drivers to save resources, a shared pool passed in is left for its owner to close
         :return:
         """
-        self.driver.quit()
+        if self.owns_pool:
+            self.driver_pool.close()
+        if self.http_client:
+            self.http_client.close()
 
 
 if __name__ == '__main__':
     # Short scraper test for demonstration purposes
     scraper = OpggScraper("na", "ArCaNeAscension#THICC", auto_scrape=True)  # test for unranked
     print(scraper)
+    print(scraper.waiter.stats())
     scraper.quit_driver()
@@ -0,0 +1,177 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+
+"""
+Browserless backend for OpggScraper
+op.gg renders profiles on the server and the Selenium driver already runs with javascript disabled, so the profile and
+queue tab pages can be fetched over plain pooled HTTP connections and parsed with lxml using the same XPaths as the
+Selenium scraper; the parsers return payload dicts that OpggScraper.record_profile and record_queue_tab turn into its
+player_ranks, player_game_ranks, player_mastery and player_champs structures
+"""
+
+# Queue tabs scraped for every player and how much a game in each counts towards recent roles
+QUEUE_WEIGHTS = {"NORMAL": 1, "SOLORANKED": 2}
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/132.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "opgg")
+
+
+def element_text(element):
+    """
+    Text of an element with one line per text node, close to what selenium's .text returns
+    :param element: lxml element
+    :return: str
+    """
+    return "\n".join(text.strip() for text in element.itertext() if text.strip())
+
+
+def parse_profile(html):
+    """
+    Parses ranks and mastery out of a profile page
+    :param html: str html of the profile page
+    :return: dict with current_rank (str or None), seasons, past_ranks and mastery lists
+    """
+    tree = lxml.html.fromstring(html)
+    # Same element the selenium scraper waits for, without it the page isn't a loaded profile
+    if not tree.xpath("//button//span[text()='Update']"):
+        raise ValueError("Page is not a loaded op.gg profile")
+    current_rank = None
+    solo_queue = tree.xpath("//span[text()='Ranked Solo/Duo']/..")
+    if solo_queue:
+        if "Unranked" in element_text(solo_queue[0]):
+            current_rank = element_text(solo_queue[0]).split("\n")[1]
+        else:
+            tier = solo_queue[0].xpath("..//div[@class='tier']")
+            current_rank = element_text(tier[0]) if tier else None
+    seasons = []
+    past_ranks = []
+    rank_list = tree.xpath("//div[@id='content-container']//table[1]")
+    if rank_list:
+        seasons = [element_text(season) for season in rank_list[0].xpath(".//b[@class='season']")]
+        past_ranks = [element_text(rank) for rank in rank_list[0].xpath(".//div[@class='rank-item']")]
+    mastery = [m.text_content() for m in tree.xpath("//div[text() = 'Mastery']/..//strong[@class='champion-name']")]
+    return dict(current_rank=current_rank, seasons=seasons, past_ranks=past_ranks, mastery=mastery)
+
+
+def parse_queue_tab(html):
+    """
+    Parses the recent games of one queue tab
+    :param html: str html of the profile page opened on a queue tab
+    :return: dict with avg_tiers, summoner_names (10 per game in page order) and champs lists
+    """
+    tree = lxml.html.fromstring(html)
+    if not tree.xpath("//button//span[text()='Update']"):
+        raise ValueError("Page is not a loaded op.gg profile")
+    return dict(
+        avg_tiers=[element_text(e) for e in tree.xpath("//*[contains(concat(' ', @class, ' '), ' avg-tier ')]")],
+        summoner_names=[p.text_content() for p in tree.xpath("//div[@class='summoner-tooltip']//span")],
+        champs=[c.get("alt") for c in tree.xpath("//div[@class='inner']//div[@class='info']//a[@class='champion']//img")])
+
+
+def parse_pages(pages):
+    """
+    Parses a profile and the queue tabs found among its pages
+    :param pages: dict of "profile" or queue type to str html, as returned by OpggHttpClient.fetch_pages
+    :return: tuple of (profile payload or None if there is no profile page, dict of queue type to tab payload)
+    """
+    profile = parse_profile(pages["profile"]) if "profile" in pages else None
+    tabs = {queue: parse_queue_tab(pages[queue]) for queue in QUEUE_WEIGHTS if queue in pages}
+    return profile, tabs
+
+
+class OpggHttpClient:
+    def __init__(self, pool_size=8, timeout=10):
+        """
+        Creates a session that keeps connections to op.gg open between requests
+        :param pool_size: Max connections kept per host, also how many players are scraped at the same time
+        :param timeout: Seconds before a request is given up on
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, params=None):
+        """
+        :param url: page to fetch
+        :param params: optional dict of query parameters
+        :return: str html of the page
+        """
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def fetch_pages(self, link, profile=True, queues=QUEUE_WEIGHTS):
+        """
+        Fetches a profile and each of its queue tabs
+        :param link: op.gg link of the player
+        :param profile: Whether to fetch the profile page
+        :param queues: Queue types of the tabs to fetch
+        :return: dict of "profile" or queue type to str html
+        """
+        pages = dict(profile=self.get(link)) if profile else dict()
+        pages.update({queue: self.get(link, params=dict(queue_type=queue)) for queue in queues})
+        return pages
+
+    def fetch_profile(self, link):
+        """
+        Fetches and parses a profile and each of its queue tabs
+        :param link: op.gg link of the player
+        :return: tuple of (profile payload, dict of queue type to tab payload)
+        """
+        return parse_pages(self.fetch_pages(link))
+
+    def close(self):
+        self.session.close()
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """
+    Serves saved pages as if they were op.gg, /summoners/<server>/<name>?queue_type=<queue> maps to <name>_<queue>.html
+    """
+    def translate_path(self, path):
+        url = urlsplit(path)
+        name = url.path.rstrip("/").split("/")[-1]
+        queue = parse_qs(url.query).get("queue_type")
+        file_name = f"{name}_{queue[0]}.html" if queue else f"{name}.html"
+        return os.path.join(self.directory, file_name)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory=FIXTURE_DIR):
+    """
+    Starts a local server of saved op.gg pages in a background thread
+    :param directory: folder of saved pages
+    :return: tuple of (server, str base url to use in place of https://www.op.gg)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FixtureHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == '__main__':
+    # Scrapes the saved pages in fixtures/opgg without a browser, Missing-NA1 has no saved page so it fails
+    from opgg_Scraper import OpggScraper
+
+    fixture_server, base_url = serve_fixtures()
+    links = [f"{base_url}/summoners/na/{name}" for name in ["Fixture-NA1", "Unranked-NA1", "Missing-NA1"]]
+    scraper = OpggScraper(player_list=links, backend="http", selenium_fallback=False)
+    scraper.scrape_all()
+    print(scraper)
+    scraper.quit_driver()
+    fixture_server.shutdown()
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+"""
+Explicit wait layer for the scrapers
+Every wait is on a concrete DOM condition and has a name, i.e. "profile" or "tab"; how long each wait took is recorded
+per name and the timeout of the next wait adapts to the slowest recent waits, so slow pages get enough time while a
+page that is never going to load fails after a few seconds instead of holding up every player queued behind it
+"""
+
+
+class PageNotReady(TimeoutException):
+    """
+    Raised when a page doesn't reach its ready condition in time
+    """
+
+
+def document_complete(driver):
+    """
+    Wait condition, true once the browser has finished loading the current page
+    :param driver: selenium driver
+    :return: bool
+    """
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def element_replaced(element):
+    """
+    Wait condition for pages that update in place, true once an element is removed from the page or its text changes
+    :param element: selenium element, its text is read right away to compare against
+    :return: function of the driver returning bool
+    """
+    old_text = element.text
+
+    def condition(driver):
+        try:
+            return element.text != old_text
+        except StaleElementReferenceException:
+            return True
+    return condition
+
+
+class PageWaiter:
+    def __init__(self, default_timeout=10.0, min_timeout=2.0, max_timeout=30.0, slack=3.0, history=50,
+                 poll_frequency=0.1):
+        """
+        Creates a waiter shared by every scraper thread
+        :param default_timeout: Seconds allowed for a wait that has no recorded history yet
+        :param min_timeout: Adaptive timeouts never go below this
+        :param max_timeout: Adaptive timeouts never go above this
+        :param slack: Adaptive timeout is this times the 95th percentile of recent successful waits
+        :param history: Number of recent waits kept per name
+        :param poll_frequency: Seconds between condition checks
+        """
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.slack = slack
+        self.poll_frequency = poll_frequency
+        self.durations = defaultdict(lambda: deque(maxlen=history))
+        self.timeouts = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def timeout_for(self, name):
+        """
+        :param name: name of the wait
+        :return: float seconds the next wait of this name is allowed
+        """
+        with self.lock:
+            durations = list(self.durations[name])
+        if len(durations) < 5:
+            return self.default_timeout
+        return float(min(self.max_timeout, max(self.min_timeout, self.slack * np.percentile(durations, 95))))
+
+    def wait(self, driver, name, condition, timeout=None, message="", deadline=None):
+        """
+        Blocks until a condition is true and records how long it took
+        :param driver: selenium driver
+        :param name: name of the wait, timings are kept per name
+        :param condition: function of the driver, i.e. an expected_conditions object, truthy once ready
+        :param timeout: Seconds to allow, the adaptive timeout of name if None
+        :param message: Added to the error if the wait times out
+        :param deadline: Optional time.time() the wait must finish by, shortens the timeout if it is sooner
+        :return: the value returned by condition
+        """
+        timeout = timeout or self.timeout_for(name)
+        if deadline is not None:
+            if deadline <= time.time():
+                raise PageNotReady(f"Out of time before {name} {message}".strip())
+            timeout = min(timeout, deadline - time.time())
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            with self.lock:
+                self.timeouts[name] += 1
+            raise PageNotReady(f"{name} not ready after {timeout:.1f} seconds {message}".strip())
+        with self.lock:
+            self.durations[name].append(time.perf_counter() - start)
+        return result
+
+    def stats(self):
+        """
+        :return: dict of wait name to count, mean and p95 seconds, timeouts and the current timeout
+        """
+        with self.lock:
+            names = set(self.durations) | set(self.timeouts)
+            durations = {name: list(self.durations[name]) for name in names}
+            timeouts = dict(self.timeouts)
+        output = dict()
+        for name in sorted(names):
+            output[name] = dict(count=len(durations[name]), timeouts=timeouts.get(name, 0),
+                                mean=round(float(np.mean(durations[name])), 3) if durations[name] else None,
+                                p95=round(float(np.percentile(durations[name], 95)), 3) if durations[name] else None,
+                                timeout=round(self.timeout_for(name), 3))
+        return output
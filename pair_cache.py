@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+"""
+Shared cache of MatchMaker.get_best_pair results
+The cache lives at module level so it is kept between MatchMaker objects; entries are keyed by player names and a hash
+of each player's state, so edits never return stale results, and Player.update_roles drops entries of edited players
+"""
+
+
+class PairCache:
+    def __init__(self, max_size=4096):
+        """
+        Creates a least recently used cache of deterministic pair orderings
+        :param max_size: Max number of entries kept before the least recently used is dropped
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # Player name to the keys that include that player, used to invalidate
+        self.keys_by_player = defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Looks up a cached ordering and marks it as recently used
+        :param key: key built by make_key
+        :return: the cached value or None if not found
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        """
+        Stores an ordering, dropping the least recently used entry if the cache is full
+        :param key: key built by make_key
+        :param value: value to store
+        :return:
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            for name, _ in key[1]:
+                self.keys_by_player[name].add(key)
+            while len(self.entries) > self.max_size:
+                old_key, _ = self.entries.popitem(last=False)
+                self._forget_key(old_key)
+
+    def invalidate(self, name):
+        """
+        Drops every entry that includes a player, called when a player's roles or ranks change
+        :param name: name of the player in form of name#tag
+        :return:
+        """
+        with self.lock:
+            for key in self.keys_by_player.pop(name, set()):
+                if self.entries.pop(key, None) is not None:
+                    self._forget_key(key)
+
+    def clear(self):
+        """
+        Empties the cache
+        :return:
+        """
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_player.clear()
+
+    def _forget_key(self, key):
+        """
+        Removes a dropped key from the per player index
+        :param key: key that is no longer stored
+        :return:
+        """
+        for name, _ in key[1]:
+            keys = self.keys_by_player.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_player[name]
+
+
+def make_key(role, players):
+    """
+    Builds a cache key that doesn't depend on the order players were given in
+    :param role: role the players are compared for
+    :param players: list of player objects
+    :return: tuple of (key, players sorted in key order)
+    """
+    ordered = sorted(players, key=lambda p: (p.name, p.state_hash))
+    return (role, tuple((p.name, p.state_hash) for p in ordered)), ordered
+
+
+pair_cache = PairCache()
@@ -1,7 +1,10 @@
 import random
+import weakref
 from itertools import groupby
 import Rank_handler
 from collections import Counter
+from pair_cache import pair_cache
+from player_pool import RoleRow, default_pool
 
 
 def convert_to_name(player_data):
@@ -32,15 +35,24 @@ class Player:
     # Minimum percentage of someone's game for it to be considered as a preferred_role
     minimum_game_percentage_threshold = 0.25
 
-    def __init__(self, name, rank_score, champs_played, mastery, role_ranks=None, role_chances=None, preferred_roles=None):
+    def __init__(self, name, rank_score, champs_played, mastery, role_ranks=None, role_chances=None, preferred_roles=None,
+                 pool=None, game_ranks=None, last_games=None):
         """
         :param name: Name of the player
         :param rank_score: rank_score, typically calculated by rank handler, int from 0-36
         :param champs_played: dict of all champs played in each role
         :param mastery: list of 4 highest mastery champions
         :param role_ranks: dict of each role (and flex) and the associated rank; *passing in a value for this will cause the init to ignore rank_score*
+        :param pool: PlayerPool that stores the players role ranks, chances and preferred roles, default is shared
+        :param game_ranks: list of average ranks of the players most recent games, newest first
+        :param last_games: dict of queue type to the key of the newest game scraped, see opgg_Scraper.game_keys
         """
         self.name = name
+        # role_ranks, role_chances and preferred_roles are views over this players row in the pool arrays
+        self.pool = default_pool if pool is None else pool
+        self.player_id = self.pool.add(name)
+        # The row is given back to the pool once this player is garbage collected
+        weakref.finalize(self, self.pool.release, self.player_id)
         self.link = name_to_link(self.name)
         self.champs = champs_played
         self.mastery = mastery
@@ -51,8 +63,7 @@ class Player:
         if preferred_roles:
             self.preferred_roles = preferred_roles
         else:
-            self.preferred_roles = [role for role in sorted_roles if self.champs[role].total() > total * self.minimum_game_percentage_threshold]
-            self.preferred_roles.append("flex")
+            self.preferred_roles = [role for role in sorted_roles if self.champs[role].total() > total * self.minimum_game_percentage_threshold] + ["flex"]
         # loads dict representing rank for each role; allows players to decide what they feel their rank is
         if role_ranks:
             self.role_ranks = role_ranks
@@ -75,7 +86,10 @@ class Player:
         else:
             self.role_chances = {role: round((100 * self.champs[role].total() / total) - 0.5) for role in sorted_roles}
         self.validate_chances()
+        self.game_ranks = game_ranks or []
+        self.last_games = last_games or dict()
         self.elo = 0
+        self._state_hash = None
 
     def __str__(self):
         """
@@ -114,6 +128,56 @@ class Player:
         self.rank_score = self.role_ranks[self.preferred_roles[0]]
         self.rank_str = self.rank_str_by_role[self.preferred_roles[0]]
         self.validate_chances()
+        # Cached matchmaking comparisons of this player are no longer valid
+        self._state_hash = None
+        pair_cache.invalidate(self.name)
+
+    @property
+    def role_ranks(self):
+        """
+        :return: dict-like view of the players rank in each role and flex
+        """
+        return RoleRow(self.pool, "role_ranks", self.player_id, ["top", "jungle", "mid", "adc", "supp", "flex"])
+
+    @role_ranks.setter
+    def role_ranks(self, role_ranks):
+        self.pool.clear_row("role_ranks", self.player_id)
+        view = self.role_ranks
+        view.update({role: rank for role, rank in role_ranks.items() if role in view})
+
+    @property
+    def role_chances(self):
+        """
+        :return: dict-like view of the players chance of playing each role
+        """
+        return RoleRow(self.pool, "role_chances", self.player_id, ["top", "jungle", "mid", "adc", "supp"])
+
+    @role_chances.setter
+    def role_chances(self, role_chances):
+        self.pool.clear_row("role_chances", self.player_id)
+        view = self.role_chances
+        view.update({role: chance for role, chance in role_chances.items() if role in view})
+
+    @property
+    def preferred_roles(self):
+        """
+        :return: List of the players preferred roles in order, always a new list
+        """
+        return self.pool.get_preferred_roles(self.player_id)
+
+    @preferred_roles.setter
+    def preferred_roles(self, roles):
+        self.pool.set_preferred_roles(self.player_id, roles)
+
+    @property
+    def state_hash(self):
+        """
+        Hash of the player data matchmaking compares, recalculated after update_roles
+        :return: int hash of preferred roles and role ranks
+        """
+        if self._state_hash is None:
+            self._state_hash = hash((tuple(self.preferred_roles), tuple(sorted(self.role_ranks.items()))))
+        return self._state_hash
 
     def validate_chances(self, max_chance=90):
         """
@@ -167,6 +231,44 @@ class Player:
         return ", ".join(recent_played)
 
 
+def players_from_scraper(scraper, stored=None) -> list[Player]:
+    """
+    Creates Player objects from everything an OpggScraper has scraped
+    Partial scrapes are merged with stored players: data of skipped steps, i.e. mastery and champs after a
+    "ranks-only" scrape or the rank after a "roles-only" scrape, is taken from the stored player
+    :param scraper: OpggScraper that has finished scraping
+    :param stored: Optional dict of player name to their stored player object
+    :return: The list of created player objects list[Player], players without any rank to score are left out
+    """
+    stored = stored or dict()
+    rank_handler = Rank_handler.RankHandler(scraper.player_ranks, scraper.player_game_ranks,
+                                            {name: p.rank_score for name, p in stored.items()})
+    # print(rank_handler)
+    players = []
+    for player in rank_handler.player_scores:
+        # A failed player may still have stored game ranks loaded, but nothing new to build from
+        if player in scraper.failed_players:
+            continue
+        old = stored.get(player)
+        if old is None or scraper.scrape_profile == "full":
+            players.append(Player(player, rank_handler.player_scores[player], scraper.player_champs[player],
+                                  scraper.player_mastery[player], game_ranks=scraper.player_game_ranks[player],
+                                  last_games=scraper.last_seen_games[player]))
+            continue
+        champs = scraper.player_champs[player] if "games" in scraper.steps_for(player) else old.champs
+        mastery = scraper.player_mastery[player] if "mastery" in scraper.steps else old.mastery
+        if "ranks" in scraper.steps:
+            # New rank in every role, the roles a player chose stay as stored
+            players.append(Player(player, rank_handler.player_scores[player], champs, mastery,
+                                  role_chances=dict(old.role_chances), preferred_roles=old.preferred_roles,
+                                  game_ranks=scraper.player_game_ranks[player], last_games=scraper.last_seen_games[player]))
+        else:
+            # Roles are recalculated from the new games, the stored rank of each role is kept
+            players.append(Player(player, rank_handler.player_scores[player], champs, mastery,
+                                  role_ranks=dict(old.role_ranks), game_ranks=scraper.player_game_ranks[player],
+                                  last_games=scraper.last_seen_games[player]))
+    return players
+
 if __name__ == '__main__':
     # Simple test displaying a player with no stored information
     p = Player("test_man", 20, {'top': Counter({'Warwick': 1}), 'jungle': Counter({'Udyr': 1}), 'mid': Counter({'Lux': 2, "Kai'Sa": 2, 'Aurelion Sol': 1, 'Aurora': 1, 'Jhin': 1}), 'adc': Counter({"Kai'Sa": 5, 'Jhin': 1, 'Vayne': 1, 'Swain': 1, 'Miss Fortune': 1, 'Ezreal': 1, 'Aurelion Sol': 1, 'Zoe': 1}), 'supp': Counter({'Zoe': 3, "Kai'Sa": 1})},['Ezreal', "Kai'Sa", 'Yasuo', 'Lux'])
@@ -0,0 +1,201 @@
+import threading
+from collections.abc import MutableMapping
+
+import numpy as np
+
+"""
+Array backed storage for player data used by matchmaking
+Role ranks, role chances and preferred role order of every player live in dense players x roles NumPy arrays, each
+player is a row found by an integer id; Player objects only hold views over their row so algorithms can read whole
+rosters as arrays while the rest of the code keeps using dicts and lists
+A row is released once its Player is garbage collected and given to the next player added, so the pool only grows with
+the number of players alive at once; writes and growth happen under the pool lock so no write lands in a replaced array
+"""
+
+ROLE_COLUMNS = ["top", "jungle", "mid", "adc", "supp", "flex"]
+ROLE_INDEX = {role: i for i, role in enumerate(ROLE_COLUMNS)}
+
+
+def to_python(value):
+    """
+    Converts an array value back to the type stored before, whole numbers come back as int
+    :param value: float read from a pool array
+    :return: int or float
+    """
+    return int(value) if value.is_integer() else value
+
+
+class RoleRow(MutableMapping):
+    def __init__(self, pool, field, player_id, roles):
+        """
+        Dict-like view of a single players row in one of the pool arrays, keyed by role name
+        :param pool: PlayerPool the row belongs to
+        :param field: Name of the pool array, i.e. "role_ranks"
+        :param player_id: Row of the player
+        :param roles: Roles that are keys of this view
+        """
+        self.pool = pool
+        self.field = field
+        self.player_id = player_id
+        self.roles = roles
+
+    def __getitem__(self, role):
+        if role not in self.roles:
+            raise KeyError(role)
+        return to_python(getattr(self.pool, self.field).item(self.player_id, ROLE_INDEX[role]))
+
+    def __setitem__(self, role, value):
+        if role not in self.roles:
+            raise KeyError(role)
+        self.pool.set_value(self.field, self.player_id, role, value)
+
+    def __delitem__(self, role):
+        raise TypeError("Roles can't be removed from a player")
+
+    def __iter__(self):
+        return iter(self.roles)
+
+    def __len__(self):
+        return len(self.roles)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class PlayerPool:
+    def __init__(self, capacity=16):
+        """
+        Creates an empty pool, arrays double in size whenever they are full
+        :param capacity: Number of rows allocated up front
+        """
+        # Rows ever handed out, released rows are reused before new ones
+        self.size = 0
+        self.free_ids = []
+        self.names = []
+        self.role_ranks = np.zeros((capacity, len(ROLE_COLUMNS)))
+        self.role_chances = np.zeros((capacity, len(ROLE_COLUMNS)))
+        # Index into ROLE_COLUMNS of each preferred role in order, padded with -1
+        self.preferred = np.full((capacity, len(ROLE_COLUMNS)), -1, dtype=np.int8)
+        # Decoded preferred roles of each row, only written by set_preferred_roles so it can't go out of sync
+        self.preferred_lists = []
+        # Reentrant as release runs from garbage collection, which can happen while this thread holds the lock
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return self.size - len(self.free_ids)
+
+    def add(self, name):
+        """
+        Adds an empty row for a new player, reusing a released row if there is one
+        :param name: Name of the player
+        :return: int id of the players row
+        """
+        with self.lock:
+            if self.free_ids:
+                player_id = self.free_ids.pop()
+                self.names[player_id] = name
+                return player_id
+            if self.size == len(self.role_ranks):
+                self.role_ranks = self._grow(self.role_ranks, 0)
+                self.role_chances = self._grow(self.role_chances, 0)
+                self.preferred = self._grow(self.preferred, -1)
+            self.names.append(name)
+            self.preferred_lists.append([])
+            self.size += 1
+            return self.size - 1
+
+    def _grow(self, array, fill):
+        """
+        :param array: Pool array that is full
+        :param fill: Value of the new rows
+        :return: Copy of the array with twice the rows
+        """
+        grown = np.full((len(array) * 2, array.shape[1]), fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def release(self, player_id):
+        """
+        Clears the row of a player that no longer exists so it can be reused, called when the Player is collected
+        :param player_id: Row of the player
+        :return:
+        """
+        with self.lock:
+            self.role_ranks[player_id] = 0
+            self.role_chances[player_id] = 0
+            self.preferred[player_id] = -1
+            self.preferred_lists[player_id] = []
+            self.names[player_id] = None
+            self.free_ids.append(player_id)
+
+    def set_value(self, field, player_id, role, value):
+        """
+        :param field: Name of the pool array, i.e. "role_ranks"
+        :param player_id: Row of the player
+        :param role: Column to set
+        :param value: New value
+        :return:
+        """
+        with self.lock:
+            getattr(self, field)[player_id, ROLE_INDEX[role]] = value
+
+    def clear_row(self, field, player_id):
+        """
+        :param field: Name of the pool array, i.e. "role_ranks"
+        :param player_id: Row of the player to set to 0
+        :return:
+        """
+        with self.lock:
+            getattr(self, field)[player_id] = 0
+
+    def get_preferred_roles(self, player_id):
+        """
+        :param player_id: Row of the player
+        :return: List of the players preferred roles in order
+        """
+        return list(self.preferred_lists[player_id])
+
+    def set_preferred_roles(self, player_id, roles):
+        """
+        :param player_id: Row of the player
+        :param roles: List of roles in order of preference
+        :return:
+        """
+        with self.lock:
+            self.preferred[player_id] = -1
+            self.preferred[player_id, :len(roles)] = [ROLE_INDEX[role] for role in roles]
+            self.preferred_lists[player_id] = list(roles)
+
+    def rank_matrix(self, ids):
+        """
+        :param ids: List of player ids
+        :return: array of shape (len(ids), 5) of each players rank in each role, flex excluded
+        """
+        return self.role_ranks[ids, :5]
+
+    def chance_matrix(self, ids):
+        """
+        :param ids: List of player ids
+        :return: array of shape (len(ids), 5) of each players chance to play each role, flex excluded
+        """
+        return self.role_chances[ids, :5]
+
+    def preference_costs(self, ids):
+        """
+        Calculates how far down their preferred roles each role is for many players at once
+        Same rules as match_solver.preference_cost: unlisted roles count as flex, or one past the last role
+        :param ids: List of player ids
+        :return: array of shape (len(ids), 5)
+        """
+        order = self.preferred[ids]
+        listed = order >= 0
+        rows, positions = np.nonzero(listed)
+        # role_positions[p, r] is where role r is in player p's order, -1 if not listed
+        role_positions = np.full(order.shape, -1)
+        role_positions[rows, order[rows, positions]] = positions
+        flex = role_positions[:, ROLE_INDEX["flex"]]
+        unlisted = np.where(flex >= 0, flex, listed.sum(axis=1))
+        return np.where(role_positions[:, :5] >= 0, role_positions[:, :5], unlisted[:, None]).astype(float)
+
+
+default_pool = PlayerPool()
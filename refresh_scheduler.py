@@ -0,0 +1,168 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+from driver_pool import DriverPool
+from opgg_Scraper import OpggScraper
+from player import name_to_link, players_from_scraper
+
+"""
+Keeps stored player data fresh in the background
+Every stored player is queued by the time their data is due for a refresh, a little before StorageTool considers it too
+old, and a single worker thread re-scrapes them one at a time under a global rate limit; failed scrapes are retried
+with exponential backoff, so startup reads cached data instead of waiting on selenium
+"""
+
+
+class RefreshScheduler:
+    def __init__(self, storage, refresh_after=timedelta(days=5), min_interval=30.0, base_backoff=60.0,
+                 max_backoff=3600.0, backend="selenium", scrape_profile="full", snapshots=None,
+                 on_refresh=None):
+        """
+        Creates a scheduler, call start to begin refreshing
+        :param storage: StorageTool refreshed players are saved to
+        :param refresh_after: Age at which a players data is refreshed, keep below the one week StorageTool allows
+        :param min_interval: Min seconds between the start of two scrapes, the global rate limit
+        :param base_backoff: Seconds before the first retry of a failed scrape, doubled on every further failure
+        :param max_backoff: Max seconds between retries, a player keeps being retried this often until it succeeds
+        :param backend: OpggScraper backend used to refresh, "selenium" or "http"
+        :param scrape_profile: OpggScraper scrape profile used to refresh, partial results are merged with stored data
+        :param snapshots: Optional SnapshotStore every refreshed page is saved to
+        :param on_refresh: Optional function called with each refreshed Player once it is saved, i.e. to update the
+        players already in memory
+        """
+        self.storage = storage
+        self.refresh_after = refresh_after
+        self.min_interval = min_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.backend = backend
+        self.scrape_profile = scrape_profile
+        self.snapshots = snapshots
+        self.on_refresh = on_refresh
+        # Heap of (due timestamp, order added, name); entries that no longer match self.due are skipped when popped
+        self.queue = []
+        self.due = dict()
+        self.failures = dict()
+        self.order = itertools.count()
+        self.last_scrape = 0.0
+        self.refreshed = 0
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        # One long lived driver is reused for every refresh
+        self.driver_pool = DriverPool(size=1)
+
+    def schedule(self, name, due):
+        """
+        Queues a player or moves their refresh to a new time
+        :param name: name of the player in form of name#tag
+        :param due: datetime to refresh at, the past means as soon as possible
+        :return:
+        """
+        with self.condition:
+            self.due[name] = due.timestamp()
+            heapq.heappush(self.queue, (self.due[name], next(self.order), name))
+            self.condition.notify()
+
+    def schedule_stored(self):
+        """
+        Queues every stored player by the age of their data, players past refresh_after are due right away
+        :return:
+        """
+        for name, added_date in self.storage.added_dates().items():
+            self.schedule(name, added_date + self.refresh_after)
+
+    def start(self):
+        """
+        Queues every stored player and starts the worker thread
+        :return:
+        """
+        self.schedule_stored()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the worker after its current scrape and quits its driver
+        :return:
+        """
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+        self.driver_pool.close()
+
+    def next_due(self):
+        """
+        Blocks until a player is due and the rate limit allows another scrape
+        :return: name of the player, None once stopped
+        """
+        with self.condition:
+            while not self.stop_event.is_set():
+                while self.queue and self.due.get(self.queue[0][2]) != self.queue[0][0]:
+                    heapq.heappop(self.queue)
+                now = time.time()
+                start_at = max(self.queue[0][0], self.last_scrape + self.min_interval) if self.queue else None
+                if start_at is not None and start_at <= now:
+                    _, _, name = heapq.heappop(self.queue)
+                    del self.due[name]
+                    self.last_scrape = now
+                    return name
+                # Woken early by schedule or stop, otherwise sleeps until the next player is due
+                self.condition.wait(None if start_at is None else start_at - now)
+        return None
+
+    def run(self):
+        """
+        Worker loop, refreshes players as they come due until stopped
+        :return:
+        """
+        while True:
+            name = self.next_due()
+            if name is None:
+                return
+            try:
+                self.refresh(name)
+                self.failures.pop(name, None)
+                self.refreshed += 1
+                self.schedule(name, datetime.now() + self.refresh_after)
+            except Exception as e:
+                self.retry_later(name, e)
+
+    def refresh(self, name):
+        """
+        Scrapes one player and saves the new data
+        :param name: name of the player in form of name#tag
+        :return:
+        """
+        print(f"Refreshing data for {name}")
+        scraper = OpggScraper(link=name_to_link(name), driver_pool=self.driver_pool, backend=self.backend,
+                              history=self.storage.get_history([name]), scrape_profile=self.scrape_profile,
+                              max_attempts=1, snapshots=self.snapshots)
+        # Retries are left to the backoff of this scheduler
+        result = scraper.scrape_all()[name]
+        scraper.quit_driver()
+        if result["status"] == "failed":
+            raise RuntimeError(result["reason"])
+        stored = self.storage.get_player(name, max_age=None)
+        for player in players_from_scraper(scraper, {name: stored} if stored else None):
+            self.storage.add_player(player)
+            if self.on_refresh:
+                self.on_refresh(player)
+
+    def retry_later(self, name, error):
+        """
+        Schedules a failed player again with exponential backoff
+        :param name: name of the player
+        :param error: the exception the scrape failed with
+        :return:
+        """
+        failures = self.failures.get(name, 0) + 1
+        self.failures[name] = failures
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (failures - 1))
+        print(f"Refreshing {name} failed {failures} time(s) ({error}), retrying in {backoff:.0f} seconds")
+        self.schedule(name, datetime.now() + timedelta(seconds=backoff))
@@ -0,0 +1,138 @@
+import os
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import JavascriptException
+
+from log_scraper import HISTORY_ROWS, HISTORY_SCRIPT, PRUNE_ROWS_SCRIPT, parse_history_rows
+from opgg_http import FIXTURE_DIR, parse_profile, parse_queue_tab
+from opgg_Scraper import PROFILE_SCRIPT, QUEUE_TAB_SCRIPT
+from snapshot_store import SnapshotPage
+
+"""
+Offline stand-in for the selenium driver
+Serves recorded pages by url and supports the lookups, clicks, waits and scripts OpggScraper and LogScraper use, so
+both can be run, timed and checked on a machine with no browser or network; scripts are answered by python handlers
+that return the same payloads as the in-browser versions
+"""
+
+LOG_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "log")
+OPGG_BASE_URL = "https://www.op.gg/summoners/na"
+LOG_BASE_URL = "https://www.leagueofgraphs.com/summoner/na"
+NOT_FOUND_PAGE = "<html><head><title>404 Not Found</title></head><body><h1>Not Found</h1></body></html>"
+
+
+def fixture_pages(directory=FIXTURE_DIR, base_url=OPGG_BASE_URL):
+    """
+    Maps saved pages to the urls they stand in for, named like FixtureHandler expects
+    <name>.html becomes <base_url>/<name> and <name>_<queue>.html becomes <base_url>/<name>?queue_type=<queue>
+    :param directory: folder of saved pages
+    :param base_url: url the player names are appended to
+    :return: dict of url to str html
+    """
+    pages = dict()
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".html"):
+            continue
+        name, _, queue = file_name[:-len(".html")].partition("_")
+        url = f"{base_url}/{name}" + (f"?queue_type={queue}" if queue else "")
+        with open(os.path.join(directory, file_name), "r", encoding="utf-8") as file:
+            pages[url] = file.read()
+    return pages
+
+
+def prune_rows(driver, count):
+    """
+    Same as PRUNE_ROWS_SCRIPT on a ReplayDriver
+    :param driver: ReplayDriver
+    :param count: number of game rows to remove
+    :return:
+    """
+    for row in driver.element.xpath(HISTORY_ROWS)[:count]:
+        row.getparent().remove(row)
+
+
+class ReplayDriver(SnapshotPage):
+    # Script run by the scrapers mapped to a function of (driver, *args) returning what the browser would
+    SCRIPTS = {
+        "return document.readyState": lambda driver: "complete",
+        "arguments[0].click();": lambda driver, element: element.click(),
+        PROFILE_SCRIPT: lambda driver: parse_profile(driver.page_source),
+        QUEUE_TAB_SCRIPT: lambda driver: parse_queue_tab(driver.page_source),
+        # The tree is parsed instead of page_source, which doesn't change when rows are pruned
+        HISTORY_SCRIPT: lambda driver, skip=0: parse_history_rows(driver.element)[skip:],
+        PRUNE_ROWS_SCRIPT: prune_rows,
+    }
+
+    def __init__(self, pages):
+        """
+        Creates a driver with a blank page open
+        :param pages: dict of url to str html it serves, see fixture_pages; urls it doesn't know load a 404 page
+        """
+        super().__init__("<html><body></body></html>", "about:blank")
+        self.pages = pages
+        self.window_handles = ["replay"]
+        self.requests = 0
+
+    @classmethod
+    def register_script(cls, script, handler):
+        """
+        Adds support for a script
+        :param script: str exact script passed to execute_script
+        :param handler: function of (driver, *args) returning the result of the script
+        :return:
+        """
+        cls.SCRIPTS[script] = handler
+
+    def get(self, url):
+        """
+        Opens a page, every element found on the previous page goes stale
+        :param url: url to open
+        :return:
+        """
+        self.requests += 1
+        self.load(self.pages.get(url, NOT_FOUND_PAGE), url)
+
+    def click(self, element):
+        """
+        Follows a link, or switches queue tabs like op.gg does when a button or option with a value is clicked
+        :param element: SnapshotElement clicked
+        :return:
+        """
+        href = element.get_attribute("href")
+        value = element.get_attribute("value")
+        if element.tag_name == "a" and href and not href.startswith("#"):
+            self.get(href)
+        elif element.tag_name in ("button", "option") and value:
+            url = urlsplit(self.current_url)
+            self.get(f"{url.scheme}://{url.netloc}{url.path}?queue_type={value}")
+
+    def execute_script(self, script, *args):
+        """
+        :param script: str script known to SCRIPTS
+        :param args: arguments passed to the script
+        :return: what the script would have returned in the browser
+        """
+        if script not in self.SCRIPTS:
+            raise JavascriptException(f"Script is not supported by ReplayDriver: {script.strip()[:60]}")
+        return self.SCRIPTS[script](self, *args)
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def implicitly_wait(self, seconds):
+        pass
+
+
+if __name__ == '__main__':
+    # Scrapes the saved pages in fixtures/opgg through the selenium code path, without a browser
+    from driver_pool import DriverPool
+    from opgg_Scraper import OpggScraper
+
+    opgg_pages = fixture_pages()
+    pool = DriverPool(size=1, create_driver=lambda: ReplayDriver(opgg_pages))
+    scraper = OpggScraper(player_list=[f"{OPGG_BASE_URL}/Fixture-NA1", f"{OPGG_BASE_URL}/Unranked-NA1"],
+                          driver_pool=pool)
+    scraper.scrape_all()
+    print(scraper)
+    print(scraper.results)
+    pool.close()
@@ -0,0 +1,241 @@
+import argparse
+import contextlib
+import io
+import json
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import dateparser
+import numpy as np
+import pandas as pd
+
+from driver_pool import DriverPool
+from log_scraper import LogScraper, pad_items, resolve_date
+from opgg_http import FIXTURE_DIR, parse_profile, parse_queue_tab
+from opgg_Scraper import OpggScraper
+from replay_driver import LOG_BASE_URL, LOG_FIXTURE_DIR, OPGG_BASE_URL, ReplayDriver, fixture_pages
+
+"""
+Offline benchmark of the scrapers
+OpggScraper and LogScraper are run on ReplayDriver against the saved pages in fixtures/, so no browser or network is
+needed and every run sees the same pages; per stage timings (page load, ranks and mastery, tab switches, every column
+of the match history) are reported as percentiles and can be compared against a saved baseline to catch slowdowns
+"""
+
+PLAYER_LINK = f"{LOG_BASE_URL}/Fixture-NA1"
+
+
+def percentiles(stage_times):
+    """
+    :param stage_times: dict of stage to list of seconds
+    :return: dict of stage to count, p50 and p90 in milliseconds
+    """
+    output = dict()
+    for stage, seconds in stage_times.items():
+        p50, p90 = np.percentile(seconds, [50, 90]) * 1000
+        output[stage] = dict(count=len(seconds), p50_ms=round(float(p50), 3), p90_ms=round(float(p90), 3))
+    return output
+
+
+def opgg_benchmark(runs, pages):
+    """
+    Scrapes every saved op.gg profile through the selenium code path of OpggScraper
+    :param runs: Number of times the whole set of profiles is scraped
+    :param pages: dict of url to html, see replay_driver.fixture_pages
+    :return: dict of stage to percentiles, "player" is the whole scrape of one profile
+    """
+    links = [url for url in pages if "?" not in url]
+    stage_times = defaultdict(list)
+    for _ in range(runs):
+        pool = DriverPool(size=1, create_driver=lambda: ReplayDriver(pages))
+        scraper = OpggScraper(player_list=links, driver_pool=pool)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = scraper.scrape_all()
+        pool.close()
+        failed = [player for player, result in results.items() if result["status"] != "ok"]
+        if failed:
+            raise RuntimeError(f"Fixtures could not be scraped: {failed}")
+        for stage, seconds in scraper.stage_times.items():
+            stage_times[stage].extend(seconds)
+    return percentiles(stage_times)
+
+
+def parser_benchmark(runs, pages):
+    """
+    Times the lxml parsers used by the http and replay backends on every saved page
+    :param runs: Number of times every page is parsed
+    :param pages: dict of url to html, see replay_driver.fixture_pages
+    :return: dict of parser to percentiles
+    """
+    stage_times = defaultdict(list)
+    for _ in range(runs):
+        for url, html in pages.items():
+            parser = parse_queue_tab if "queue_type=" in url else parse_profile
+            start = time.perf_counter()
+            parser(html)
+            stage_times[parser.__name__].append(time.perf_counter() - start)
+    return percentiles(stage_times)
+
+
+def log_benchmark(runs, pages):
+    """
+    Parses every saved league of graphs match history with LogScraper
+    :param runs: Number of times every page is parsed
+    :param pages: dict of url to html, see replay_driver.fixture_pages
+    :return: dict of stage to percentiles, "scrape" is the whole scrape of one page
+    """
+    stage_times = defaultdict(list)
+    for _ in range(runs):
+        for url in pages:
+            driver = ReplayDriver(pages)
+            driver.get(url)
+            start = time.perf_counter()
+            # scrape prints its progress and the DataFrame, keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                scraper = LogScraper(url, driver=driver, csv_path=None)
+            stage_times["scrape"].append(time.perf_counter() - start)
+            for stage, seconds in scraper.stage_times.items():
+                stage_times[stage].append(seconds)
+    return percentiles(stage_times)
+
+
+def history_rows(path="data_to_analyze.csv"):
+    """
+    Turns a saved match history back into game rows as HISTORY_SCRIPT would return them from the page
+    Games from the last month show relative dates like the site does, older ones a dd/mm/yyyy date
+    :param path: csv written by LogScraper.scrape
+    :return: List of row dicts
+    """
+    history = pd.read_csv(path, keep_default_na=False)
+    newest = pd.to_datetime(history['game_date']).max()
+    player = PLAYER_LINK.split("/")[-1].replace("-", "#")
+    roles = ["Top", "Jungle", "Mid", "Adc", "Support"]
+    rows = []
+    for game in history.to_dict("records"):
+        played = pd.to_datetime(game['game_date'])
+        days = (newest - played).days
+        shown_date = f"{days} days ago" if 1 < days <= 30 else played.strftime("%d/%m/%Y")
+        hours, minutes, seconds = map(int, game['game_duration'].split(":"))
+        summoners = [f"Summoner {i}" for i in range(10)]
+        if game['role'] in roles:
+            summoners[roles.index(game['role'])] = player
+        items = [game[f"Item {i}"] for i in range(1, 7)] + [game['Ward']]
+        rows.append(dict(win_lose=game['win/lose'], game_mode=game['game_mode'], game_date=shown_date,
+                         game_duration=f"{hours * 60 + minutes}min {seconds:02d}s", kills=game['kills'],
+                         deaths=game['deaths'], assists=game['assists'], champion=game['champion'],
+                         summoners=summoners,
+                         tooltip=f"Minions: {game['CS']}<br/>Vision Score: {game['Vision Score']}<br/>"
+                                 f"Kill participation: {game['KP']}<br/>",
+                         spells=[game['Summoner Spell 1'], game['Summoner Spell 2']],
+                         items=[item for item in items if item != "None"]))
+    return rows
+
+
+def per_game_columns(rows, player_name):
+    """
+    Column parsing as LogScraper did it before it was vectorized, one game at a time with a dateparser call per game
+    Kept as the baseline the columns suite compares against
+    :param rows: List of dicts from HISTORY_SCRIPT
+    :param player_name: name of the player in form of name#tag
+    :return: tuple of the parsed columns
+    """
+    game_date = []
+    for row in rows:
+        parsed_date = dateparser.parse(row["game_date"], settings={'RELATIVE_BASE': datetime.now()})
+        game_date.append(parsed_date.date() if parsed_date else None)
+    game_duration = []
+    for row in rows:
+        match = re.match(r"(\d+)min (\d+)s", row["game_duration"])
+        game_duration.append(timedelta(minutes=int(match.group(1)), seconds=int(match.group(2))) if match
+                             else timedelta(seconds=0))
+    roles = ["Top", "Jungle", "Mid", "Adc", "Support"]
+    role = [roles[row["summoners"].index(player_name) % 5] if player_name in row["summoners"] else "None"
+            for row in rows]
+    vision_score, cs, kp = [], [], []
+    for row in rows:
+        tooltip = row["tooltip"]
+        vision_score.append(int(tooltip.split("Vision Score: ")[-1].split("<")[0])
+                            if tooltip and "Vision Score: " in tooltip else 0)
+        cs.append(int(tooltip.split("Minions: ")[-1].split("<")[0]) if tooltip and "Minions: " in tooltip else 0)
+        kp.append(tooltip.split("Kill participation: ")[-1].split("<")[0]
+                  if tooltip and "Kill participation: " in tooltip else "None")
+    summs = [(row["spells"] + ["None"] * 2)[:2] for row in rows]
+    items = [pad_items(row["items"]) for row in rows]
+    return game_date, game_duration, role, vision_score, cs, kp, summs, items
+
+
+def columns_benchmark(runs, rows):
+    """
+    Compares per game column parsing with LogScraper.rows_to_frame, with the date cache cleared (cold) and kept (warm)
+    :param runs: Number of times the whole history is parsed by each
+    :param rows: List of row dicts, see history_rows
+    :return: dict of implementation to percentiles
+    """
+    scraper = LogScraper(PLAYER_LINK, auto_scrape=False, driver=ReplayDriver(dict()), csv_path=None)
+    stage_times = defaultdict(list)
+    for _ in range(runs):
+        start = time.perf_counter()
+        per_game_columns(rows, scraper.player_name)
+        stage_times["per_game"].append(time.perf_counter() - start)
+        resolve_date.cache_clear()
+        for cache in ["cold", "warm"]:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                scraper.rows_to_frame(rows)
+            stage_times[f"vectorized_{cache}"].append(time.perf_counter() - start)
+    return percentiles(stage_times)
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares results with a saved baseline
+    :param results: dict of suite to stage percentiles
+    :param baseline: results loaded from an earlier run
+    :param tolerance: Allowed relative growth of a p50, i.e. 0.5 for 50%
+    :return: List of str descriptions of every regression found
+    """
+    regressions = []
+    for suite, stages in results.items():
+        for stage, result in stages.items():
+            old = baseline.get(suite, dict()).get(stage)
+            # small absolute slack so sub-millisecond stages don't flag on noise
+            if old and result["p50_ms"] > old["p50_ms"] * (1 + tolerance) + 0.5:
+                regressions.append(f"{suite} {stage}: p50 went from {old['p50_ms']} ms to {result['p50_ms']} ms")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark scraper parsing offline on saved pages")
+    parser.add_argument("--suites", nargs="+", default=["opgg", "parsers", "log", "columns"],
+                        choices=["opgg", "parsers", "log", "columns"])
+    parser.add_argument("--runs", type=int, default=20, help="times every saved page is scraped")
+    parser.add_argument("--opgg-fixtures", default=FIXTURE_DIR, help="folder of saved op.gg pages")
+    parser.add_argument("--log-fixtures", default=LOG_FIXTURE_DIR, help="folder of saved league of graphs pages")
+    parser.add_argument("--history", default="data_to_analyze.csv", help="match history the columns suite parses")
+    parser.add_argument("--save", help="json file to save results to")
+    parser.add_argument("--baseline", help="json file of earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    suites = dict(opgg=lambda: opgg_benchmark(args.runs, fixture_pages(args.opgg_fixtures, OPGG_BASE_URL)),
+                  parsers=lambda: parser_benchmark(args.runs, fixture_pages(args.opgg_fixtures, OPGG_BASE_URL)),
+                  log=lambda: log_benchmark(args.runs, fixture_pages(args.log_fixtures, LOG_BASE_URL)),
+                  columns=lambda: columns_benchmark(args.runs, history_rows(args.history)))
+    results = dict()
+    for suite in args.suites:
+        results[suite] = suites[suite]()
+        for stage, result in results[suite].items():
+            print(f"{suite:>8} {stage:>18} | n {result['count']:>5} | p50 {result['p50_ms']:>10.3f} ms "
+                  f"p90 {result['p90_ms']:>10.3f} ms")
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=4)
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            raise SystemExit(1)
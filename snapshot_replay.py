@@ -0,0 +1,68 @@
+import argparse
+import time
+
+from log_scraper import LogScraper
+from opgg_Scraper import OpggScraper
+from player import players_from_scraper
+from replay_driver import ReplayDriver
+from snapshot_store import SnapshotStore
+from storage_tool import StorageTool
+
+"""
+Re-parses saved pages instead of scraping them again
+Run after fixing a selector: op.gg snapshots are turned back into Player objects (optionally written to storage) and
+league of graphs snapshots back into the LogScraper DataFrame, all without a browser
+"""
+
+
+def replay_players(snapshots, names=None):
+    """
+    Rebuilds players from their newest saved op.gg pages
+    :param snapshots: SnapshotStore to read from
+    :param names: Names of the players to rebuild, every player with op.gg snapshots if None
+    :return: List of player objects
+    """
+    scraper = OpggScraper(backend="replay", snapshots=snapshots)
+    scraper.link_map = {name: "" for name in (names or snapshots.players("opgg"))}
+    scraper.scrape_all()
+    scraper.quit_driver()
+    # Players without a saved profile fail and are left out
+    return players_from_scraper(scraper)
+
+
+def replay_history(snapshots, player_link):
+    """
+    Rebuilds the match history DataFrame from the newest saved league of graphs page of a player
+    :param snapshots: SnapshotStore the page was saved to
+    :param player_link: league of graphs link of the player
+    :return: LogScraper with df filled in
+    """
+    player_name = player_link.split("/")[-1].replace("-", "#")
+    entry = snapshots.latest(player_name, "log").get("match_history")
+    if entry is None:
+        raise ValueError(f"No saved match history for {player_name}")
+    driver = ReplayDriver({entry["url"]: snapshots.get(entry["digest"])})
+    driver.get(entry["url"])
+    return LogScraper(player_link, driver=driver)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild scraped data from saved pages without a browser")
+    parser.add_argument("--root", default="snapshots", help="folder of the snapshot store")
+    parser.add_argument("--players", nargs="*", help="names to rebuild, default is every saved player")
+    parser.add_argument("--save", action="store_true", help="store rebuilt players without resetting their age")
+    parser.add_argument("--log", nargs="*", default=[], help="league of graphs links to rebuild DataFrames for")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    start = time.perf_counter()
+    rebuilt = replay_players(store, args.players)
+    for p in rebuilt:
+        print(p)
+    if args.save:
+        storage = StorageTool()
+        for p in rebuilt:
+            storage.add_player(p, overwrite_time=False)
+    print(f"Rebuilt {len(rebuilt)} players in {time.perf_counter() - start:.2f} seconds")
+    for link in args.log:
+        replay_history(store, link)
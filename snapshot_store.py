@@ -0,0 +1,258 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import lxml.html
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+from opgg_http import element_text
+
+"""
+Archive of every page the scrapers fetch
+Pages are stored gzip compressed under the sha256 of their html, so a page that didn't change between scrapes is only
+stored once, and an append only index records which player, source (i.e. "opgg" or "log"), page and time each snapshot
+belongs to; after a parser fix the whole roster can be re-parsed from the archive instead of scraped again
+"""
+
+
+class SnapshotStore:
+    def __init__(self, root="snapshots"):
+        """
+        Opens a store, creating its folders if needed
+        :param root: Folder of the store, holds blobs/ and index.jsonl
+        """
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.index_file = os.path.join(root, "index.jsonl")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        # index.jsonl is read once, on first use, then kept up to date by put
+        self.index = None
+        self.by_player = dict()
+
+    def blob_path(self, digest):
+        """
+        :param digest: sha256 hex digest of a page
+        :return: path of the compressed page, split in folders by the first two characters
+        """
+        return os.path.join(self.blob_dir, digest[:2], digest + ".html.gz")
+
+    def put(self, player, source, page, html, url=""):
+        """
+        Stores a page and records it in the index
+        :param player: Name of the player the page belongs to in form of name#tag
+        :param source: Site the page came from, i.e. "opgg" or "log"
+        :param page: Which page of the player this is, i.e. "profile" or "SOLORANKED"
+        :param html: str html of the page
+        :param url: Optional url the page was fetched from
+        :return: str digest of the page
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        entry = dict(player=player, source=source, page=page, digest=digest, url=url,
+                     timestamp=datetime.now().isoformat())
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Written to a temporary file first so a crash never leaves a half written blob under its digest
+                with gzip.open(path + ".tmp", "wb") as file:
+                    file.write(data)
+                os.replace(path + ".tmp", path)
+            with open(self.index_file, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+            if self.index is not None:
+                self.add_to_index(entry)
+        return digest
+
+    def add_to_index(self, entry):
+        """
+        Records an entry in the in memory index, the lock must be held
+        :param entry: index entry dict
+        :return:
+        """
+        self.index.append(entry)
+        self.by_player.setdefault((entry["player"], entry["source"]), []).append(entry)
+
+    def load_index(self):
+        """
+        Reads index.jsonl the first time the index is needed
+        :return: List of every index entry, oldest first
+        """
+        with self.lock:
+            if self.index is None:
+                self.index = []
+                if os.path.exists(self.index_file):
+                    with open(self.index_file, "r") as file:
+                        for line in file:
+                            if line.strip():
+                                self.add_to_index(json.loads(line))
+            return self.index
+
+    def get(self, digest):
+        """
+        :param digest: digest returned by put
+        :return: str html of the page
+        """
+        with gzip.open(self.blob_path(digest), "rb") as file:
+            return file.read().decode("utf-8")
+
+    def entries(self, player=None, source=None):
+        """
+        Reads the index, oldest snapshots first
+        :param player: Only entries of this player if given
+        :param source: Only entries of this source if given
+        :return: List of index entry dicts
+        """
+        entries = self.load_index()
+        with self.lock:
+            if player is not None and source is not None:
+                return list(self.by_player.get((player, source), []))
+            return [e for e in entries if (player is None or e["player"] == player) and
+                    (source is None or e["source"] == source)]
+
+    def players(self, source=None):
+        """
+        :param source: Only players with snapshots of this source if given
+        :return: List of player names in the order they were first stored
+        """
+        return list(dict.fromkeys(e["player"] for e in self.entries(source=source)))
+
+    def latest(self, player, source):
+        """
+        Newest snapshot of every page of a player
+        :param player: Name of the player
+        :param source: Site the pages came from
+        :return: dict of page to index entry, empty if the player has no snapshots
+        """
+        pages = dict()
+        for entry in self.entries(player, source):
+            pages[entry["page"]] = entry
+        return pages
+
+    def latest_html(self, player, source):
+        """
+        :param player: Name of the player
+        :param source: Site the pages came from
+        :return: dict of page to str html of its newest snapshot
+        """
+        return {page: self.get(entry["digest"]) for page, entry in self.latest(player, source).items()}
+
+
+class SnapshotElement:
+    def __init__(self, element, page=None):
+        """
+        Stand-in for a selenium WebElement backed by an lxml element of a saved page
+        :param element: lxml element
+        :param page: SnapshotPage the element was found on, used to tell when it has gone stale
+        """
+        self.element = element
+        self.page = page
+        self.generation = page.generation if page else 0
+
+    def check_stale(self):
+        """
+        Raises like selenium does when the page an element was found on has been navigated away from
+        :return:
+        """
+        if self.page is not None and self.page.generation != self.generation:
+            raise StaleElementReferenceException("Element is no longer attached to the page")
+
+    @property
+    def text(self):
+        self.check_stale()
+        return element_text(self.element)
+
+    @property
+    def tag_name(self):
+        return self.element.tag
+
+    def get_attribute(self, name):
+        self.check_stale()
+        if name == "textContent":
+            return self.element.text_content()
+        return self.element.get(name)
+
+    def is_enabled(self):
+        self.check_stale()
+        return self.element.get("disabled") is None
+
+    def is_displayed(self):
+        self.check_stale()
+        return True
+
+    def click(self):
+        self.check_stale()
+        if self.page is not None:
+            self.page.click(self)
+
+    def find_element(self, by=By.ID, value=None):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"No element found for {by} {value}")
+        return found[0]
+
+    def find_elements(self, by=By.ID, value=None):
+        self.check_stale()
+        return [SnapshotElement(e, self.page) for e in self.element.xpath(to_xpath(by, value))]
+
+
+class SnapshotPage(SnapshotElement):
+    def __init__(self, html, url=""):
+        """
+        Stand-in for a selenium driver that has a saved page open, supports the element lookups the scrapers use
+        :param html: str html of the page
+        :param url: url the page was fetched from
+        """
+        self.generation = 0
+        super().__init__(None, self)
+        self.load(html, url)
+
+    def load(self, html, url):
+        """
+        Opens a page, every element found on the previous page goes stale
+        :param html: str html of the page
+        :param url: url of the page
+        :return:
+        """
+        self.element = lxml.html.fromstring(html)
+        self.page_source = html
+        self.current_url = url
+        self.generation += 1
+
+    def find_elements(self, by=By.ID, value=None):
+        # Lookups on the page start from the document, so relative paths are the same as absolute ones
+        xpath = to_xpath(by, value)
+        xpath = xpath[1:] if xpath.startswith(".//") else xpath
+        return [SnapshotElement(e, self) for e in self.element.getroottree().xpath(xpath)]
+
+    def check_stale(self):
+        pass
+
+    def click(self, element):
+        pass
+
+    def quit(self):
+        pass
+
+
+def to_xpath(by, value):
+    """
+    Converts a selenium locator into an XPath lxml understands
+    :param by: selenium By strategy, XPATH, CLASS_NAME, TAG_NAME or ID
+    :param value: value of the locator
+    :return: str XPath
+    """
+    if by == By.XPATH:
+        return value
+    if by == By.CLASS_NAME:
+        return f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+    if by == By.TAG_NAME:
+        return f".//{value}"
+    if by == By.ID:
+        return f".//*[@id='{value}']"
+    raise ValueError(f"Locator {by} is not supported on saved pages")
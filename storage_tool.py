@@ -1,4 +1,5 @@
 import json
+import threading
 from datetime import datetime, timedelta
 from collections import Counter
 from player import Player
@@ -25,6 +26,9 @@ def format_time_difference(time_difference):
 
 
 class StorageTool:
+    # Shared by every StorageTool so the refresh scheduler and the app never write the file at the same time
+    lock = threading.RLock()
+
     def __init__(self, file_name="known_players.json"):
         """
         Creates a storage tool meant to store scraped dat in json format
@@ -46,32 +50,37 @@ class StorageTool:
         :param overwrite_time: True if want to reset scrape timer, false if not
         :return:
         """
-        data = self._load_data()
-        if player.name in data and not overwrite_time:
-            date = data[player.name].get("added_date")
-        else:
-            date = datetime.now().isoformat()
+        with self.lock:
+            data = self._load_data()
+            if player.name in data and not overwrite_time:
+                date = data[player.name].get("added_date")
+            else:
+                date = datetime.now().isoformat()
 
-        # Add the player data
-        data[player.name] = {
-            "rank_score": player.rank_score,
-            "champs": {role: dict(player.champs[role]) for role in player.champs},
-            "mastery": player.mastery,
-            "role_ranks": player.role_ranks,
-            "role_chances": player.role_chances,
-            "preferred_roles": player.preferred_roles,
-            "added_date": date
-        }
-        self._save_data(data)
+            # Add the player data
+            data[player.name] = {
+                "rank_score": player.rank_score,
+                "champs": {role: dict(player.champs[role]) for role in player.champs},
+                "mastery": player.mastery,
+                "role_ranks": dict(player.role_ranks),
+                "role_chances": dict(player.role_chances),
+                "preferred_roles": player.preferred_roles,
+                "game_ranks": player.game_ranks,
+                "last_games": player.last_games,
+                "added_date": date
+            }
+            self._save_data(data)
 
-    def get_player(self, name):
+    def get_player(self, name, max_age=timedelta(weeks=1)):
         """
         Attempts to retrieve a stored player;
-        If it has been more than one week since data was last scraper or player was not found, returns None
+        If it has been more than max_age since data was last scraper or player was not found, returns None
         :param name: name of stored player information to retrieve in form of name#tag
+        :param max_age: timedelta after which data is too old, None to return data of any age
         :return: a created player object from stored data, returns None on failure
         """
-        data = self._load_data()
+        with self.lock:
+            data = self._load_data()
         player_data = data.get(name)
         if not player_data:
             print(f"No data found for {name}, now scraping")
@@ -80,15 +89,52 @@ class StorageTool:
         # Checks if the data is too old
         added_date = datetime.fromisoformat(player_data["added_date"])
         # Disabled in .exe version for dist simplicity
-        if datetime.now() - added_date > timedelta(weeks=1):
+        if max_age is not None and datetime.now() - added_date > max_age:
             print(f"Data for {name} is too old, re-scraping")
             return None
         print(f"Data for {name} was found, data is {format_time_difference(datetime.now() - added_date)} old")
         player_object = Player(name, player_data['rank_score'],
                                {r: Counter(data) for r, data in player_data['champs'].items()}, player_data['mastery'],
-                               player_data["role_ranks"], role_chances=player_data["role_chances"], preferred_roles=player_data["preferred_roles"])
+                               player_data["role_ranks"], role_chances=player_data["role_chances"], preferred_roles=player_data["preferred_roles"],
+                               game_ranks=player_data.get("game_ranks"), last_games=player_data.get("last_games"))
         return player_object
 
+    def get_history(self, names):
+        """
+        Collects the stored match history of players so a scraper only has to add games played since
+        Players stored before game history was kept have no last_games, so there is no telling which of their games
+        the stored champs already count; they are left out and scraped from scratch like new players
+        :param names: names of players in form of name#tag
+        :return: dict of name to dict of champs, game_ranks and last_games, players not stored are left out
+        """
+        with self.lock:
+            data = self._load_data()
+        return {name: dict(champs=data[name]["champs"], game_ranks=data[name].get("game_ranks", []),
+                           last_games=data[name]["last_games"])
+                for name in names if name in data and "last_games" in data[name]}
+
+    def get_scraped_data(self, name):
+        """
+        Reads the scraped part of a stored player, for updating a Player already in memory without creating another
+        :param name: name of the player in form of name#tag
+        :return: dict of champs, mastery, game_ranks and last_games, None if the player is not stored
+        """
+        with self.lock:
+            player_data = self._load_data().get(name)
+        if not player_data:
+            return None
+        return dict(champs={role: Counter(champs) for role, champs in player_data["champs"].items()},
+                    mastery=player_data["mastery"], game_ranks=player_data.get("game_ranks") or [],
+                    last_games=player_data.get("last_games") or dict())
+
+    def added_dates(self):
+        """
+        :return: dict of every stored player name to the datetime its data was scraped
+        """
+        with self.lock:
+            data = self._load_data()
+        return {name: datetime.fromisoformat(player_data["added_date"]) for name, player_data in data.items()}
+
     def _load_data(self):
         """
         Opens json file to read
@@ -0,0 +1,235 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import match_solver
+from match_maker import MatchMaker, merge_lane_weights
+
+"""
+Runs team generation in a pool of worker threads so long searches don't block Flask requests
+Each job is an anytime search: the best matchup found so far is published as soon as it improves, clients poll or
+stream it until the job's time budget runs out, and jobs can be cancelled at any point
+"""
+
+JOB_MODES = ["monte_carlo", "exact"]
+
+
+class TeamJob:
+    def __init__(self, job_id, players, mode="monte_carlo", time_budget=5.0, seed=None, lane_weights=None,
+                 option_count=1):
+        """
+        Creates a job that searches for the best matchup of the given players
+        :param job_id: Unique str id of the job
+        :param players: List of exactly 10 player objects
+        :param mode: "monte_carlo" keeps improving random trials until the time budget runs out, "exact" runs the
+        exact solver for the option_count best matchups, usually well within the budget; if it runs out of time or is
+        cancelled the best options found so far are kept
+        :param time_budget: Max seconds the search runs for
+        :param seed: Optional seed of the Monte Carlo search
+        :param lane_weights: Optional dict of role to how much that lane counts, see MatchMaker
+        :param option_count: Number of distinct matchups the exact mode keeps, see MatchMaker
+        """
+        self.job_id = job_id
+        self.players = list(players)
+        self.mode = mode
+        self.time_budget = time_budget
+        self.seed = seed
+        self.lane_weights = merge_lane_weights(lane_weights)
+        self.option_count = option_count
+        self.status = "queued"
+        self.error = None
+        self.best = None
+        self.trials = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Version goes up on every change so streams know when there is something new to send
+        self.version = 0
+        self.cancel_event = threading.Event()
+        self.updated = threading.Condition()
+
+    def run(self):
+        """
+        Runs the search in the current thread, called by a TeamJobManager worker
+        :return:
+        """
+        if self.cancel_event.is_set():
+            self._set_status("cancelled")
+            return
+        self.started = time.time()
+        self._set_status("running")
+        try:
+            solver_weights = np.array([self.lane_weights[role] for role in match_solver.ROLES])
+            if self.mode == "exact":
+                options = match_solver.solve_top_k(self.players, self.option_count, lane_weights=solver_weights,
+                                                   should_stop=self.should_stop)
+                self.publish(*options[0], self.trials, options=options)
+            else:
+                _, _, trials = match_solver.solve_monte_carlo(self.players, trials=10 ** 9, seed=self.seed,
+                                                              time_budget=self.time_budget, lane_weights=solver_weights,
+                                                              on_improve=self.publish, should_stop=self.should_stop)
+                self.trials = trials
+            self._set_status("cancelled" if self.cancel_event.is_set() else "done")
+        except Exception as e:
+            self.error = str(e)
+            self._set_status("failed")
+
+    def publish(self, assignments, cost, trials, options=None):
+        """
+        Stores a better matchup and wakes up anyone waiting for one
+        :param assignments: dict of role to [team 1 player, team 2 player]
+        :param cost: cost of the matchup, lower is better
+        :param trials: number of trials run so far
+        :param options: Optional list of (assignments, cost) tuples found with it, best first
+        :return:
+        """
+        with self.updated:
+            if self.best is None or cost < self.best.match_cost:
+                self.best = MatchMaker(self.players, options=options or [(assignments, cost)],
+                                       lane_weights=self.lane_weights)
+            self.trials = trials
+            self.version += 1
+            self.updated.notify_all()
+
+    def should_stop(self):
+        """
+        :return: True once the job is cancelled or out of time
+        """
+        return self.cancel_event.is_set() or time.time() - self.started > self.time_budget
+
+    def cancel(self):
+        """
+        Asks the job to stop, the best matchup found so far is kept
+        :return:
+        """
+        self.cancel_event.set()
+        if self.status == "queued":
+            self._set_status("cancelled")
+
+    def is_finished(self):
+        return self.status in ["done", "cancelled", "failed"]
+
+    def wait_for_update(self, version, timeout=1.0):
+        """
+        Blocks until the job changes past a version or the timeout passes
+        :param version: Last version the caller has seen
+        :param timeout: Max seconds to wait
+        :return: The current version
+        """
+        with self.updated:
+            self.updated.wait_for(lambda: self.version > version or self.is_finished(), timeout)
+            return self.version
+
+    def _set_status(self, status):
+        with self.updated:
+            self.status = status
+            if self.is_finished():
+                self.finished = time.time()
+            self.version += 1
+            self.updated.notify_all()
+
+    def to_dict(self):
+        """
+        :return: json friendly snapshot of the job and its best matchup so far
+        """
+        with self.updated:
+            output = dict(job_id=self.job_id, status=self.status, mode=self.mode, time_budget=self.time_budget,
+                          elapsed=round((self.finished or time.time()) - (self.started or time.time()), 3),
+                          trials=self.trials, version=self.version, error=self.error, best=None)
+            if self.best:
+                output["best"] = dict(
+                    cost=round(self.best.match_cost, 2), match_diff=self.best.best_match_diff,
+                    lane_diffs=self.best.lane_diffs,
+                    assignments={role: [p.name for p in pair] for role, pair in self.best.assignments.items()})
+            return output
+
+
+class TeamJobManager:
+    def __init__(self, max_workers=2, default_time_budget=5.0, max_time_budget=60.0, max_jobs=50):
+        """
+        Creates a pool of workers that run TeamJobs
+        :param max_workers: Number of jobs that can run at the same time
+        :param default_time_budget: Seconds a job runs for when no budget is given
+        :param max_time_budget: Longer budgets are cut down to this so one job can't hold a worker for long
+        :param max_jobs: Number of jobs kept, the oldest finished jobs are dropped past this
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.default_time_budget = default_time_budget
+        self.max_time_budget = max_time_budget
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def submit(self, players, mode="monte_carlo", time_budget=None, seed=None, lane_weights=None, option_count=1):
+        """
+        Queues a new job
+        :param players: List of exactly 10 player objects
+        :param mode: One of JOB_MODES
+        :param time_budget: Max seconds the search runs for, default_time_budget if None and at most max_time_budget
+        :param seed: Optional seed of the Monte Carlo search
+        :param lane_weights: Optional dict of role to how much that lane counts, see MatchMaker
+        :param option_count: Number of distinct matchups the exact mode keeps
+        :return: the created TeamJob
+        """
+        if mode not in JOB_MODES:
+            raise ValueError(f"Unknown mode {mode}")
+        if len(players) != 10:
+            raise ValueError(f"Team jobs need exactly 10 players, got {len(players)}")
+        if time_budget is None:
+            time_budget = self.default_time_budget
+        # bools are ints, but a budget of True is a mistake
+        if isinstance(time_budget, bool) or not isinstance(time_budget, (int, float)) or not time_budget > 0:
+            raise ValueError(f"time_budget must be a positive number of seconds, got {time_budget!r}")
+        time_budget = min(float(time_budget), self.max_time_budget)
+        # Checked here so bad weights fail the request instead of the job
+        merge_lane_weights(lane_weights)
+        with self.lock:
+            job = TeamJob(str(next(self.ids)), players, mode, time_budget, seed, lane_weights, option_count)
+            self.jobs[job.job_id] = job
+            self._drop_old_jobs()
+        self.executor.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        """
+        :param job_id: id of the job
+        :return: the TeamJob or None if not found
+        """
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancels a job if it exists
+        :param job_id: id of the job
+        :return: the cancelled TeamJob or None if not found
+        """
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+    def shutdown(self):
+        """
+        Cancels every job and stops the workers
+        :return:
+        """
+        with self.lock:
+            for job in self.jobs.values():
+                job.cancel()
+        self.executor.shutdown(wait=False)
+
+    def _drop_old_jobs(self):
+        """
+        Removes the oldest finished jobs while over max_jobs, assumes self.lock is held
+        :return:
+        """
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.is_finished()]:
+            if len(self.jobs) <= self.max_jobs:
+                break
+            del self.jobs[job_id]
@@ -0,0 +1,29 @@
+import os
+
+import pandas as pd
+
+from game_analytics import UNKNOWN_WEEK, GameAnalytics
+from history_store import HistoryStore
+
+PLAYER = "Fixture#NA1"
+HISTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_to_analyze.csv")
+
+
+def games(count=4):
+    return pd.read_csv(HISTORY, keep_default_na=False).head(count)
+
+
+def test_undated_games_have_their_own_week(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    undated = games()
+    undated.loc[0, 'game_date'] = None
+    store.append(PLAYER, undated)
+    analytics = GameAnalytics(store)
+    assert analytics.update() == 4
+    weeks = analytics.table(PLAYER, "week")
+    assert analytics.get(PLAYER, "week", UNKNOWN_WEEK)["games"] == 1
+    assert weeks["games"].sum() == 4 and not weeks["week"].str.contains("NA").any()
+    # Saved next to the store and read back by the next instance, which has nothing left to add
+    reopened = GameAnalytics(store)
+    assert reopened.update() == 0
+    assert reopened.get(PLAYER) == analytics.get(PLAYER)
@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+
+from history_store import UNKNOWN_SEASON, HistoryStore
+
+PLAYER = "Fixture#NA1"
+HISTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_to_analyze.csv")
+
+
+def games(count=4):
+    return pd.read_csv(HISTORY, keep_default_na=False).head(count)
+
+
+def test_append_skips_stored_games(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.append(PLAYER, games()) == 4
+    assert store.append(PLAYER, games(6)) == 2
+    assert len(store.read(PLAYER)) == 6
+
+
+def test_games_without_a_date_go_to_the_unknown_season(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    undated = games()
+    undated.loc[0, 'game_date'] = None
+    assert store.append(PLAYER, undated) == 4
+    assert store.append(PLAYER, undated) == 0
+    stored = store.read(PLAYER, columns=["game_date", "season"])
+    assert len(stored) == 4
+    assert stored['game_date'].isna().sum() == 1
+    assert (stored['season'] == UNKNOWN_SEASON).sum() == 1
+    assert store.players() == [PLAYER]
+
+
+def test_temporary_files_are_not_read(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append(PLAYER, games())
+    folder = store.partition_dir(PLAYER, 2025)
+    # What a crash between writing and renaming a file leaves behind
+    with open(os.path.join(folder, "_part-unfinished.parquet"), "wb") as file:
+        file.write(b"PAR1")
+    assert len(store.read(PLAYER)) == 4
+    assert all(os.path.basename(fragment.path).startswith("part-")
+               for fragment in store.dataset().get_fragments())
@@ -0,0 +1,125 @@
+import copy
+import json
+import os
+
+import lxml.html
+import pandas as pd
+import pytest
+
+from log_scraper import HISTORY_ROWS, LogScraper
+from replay_driver import LOG_BASE_URL, LOG_FIXTURE_DIR, ReplayDriver
+
+LINK = f"{LOG_BASE_URL}/Fixture-NA1"
+
+
+def fixture_page():
+    with open(os.path.join(LOG_FIXTURE_DIR, "Fixture-NA1.html"), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+class PagedDriver(ReplayDriver):
+    """
+    Shows the match history batch games at a time behind a show more button, like league of graphs does
+    """
+    def __init__(self, html, batch=50, interrupt_at=None):
+        super().__init__({LINK: html})
+        self.get(LINK)
+        rows = self.element.xpath(HISTORY_ROWS)
+        self.body = rows[0].getparent()
+        self.pending = rows[batch:]
+        for row in self.pending:
+            self.body.remove(row)
+        self.batch = batch
+        self.clicks = 0
+        self.interrupt_at = interrupt_at
+        self.button = lxml.html.fragment_fromstring('<tr><td><button class="see_more">See more</button></td></tr>')
+        self.body.append(self.button)
+
+    def click(self, element):
+        if element.tag_name != "button":
+            return super().click(element)
+        self.clicks += 1
+        if self.clicks == self.interrupt_at:
+            raise KeyboardInterrupt
+        shown, self.pending = self.pending[:self.batch], self.pending[self.batch:]
+        for row in shown:
+            self.button.addprevious(row)
+        if not self.pending:
+            self.body.remove(self.button)
+
+
+def with_new_games(html, count):
+    """
+    :return: html of the page with count new games on top, copies of older games with another duration
+    """
+    tree = lxml.html.fromstring(html)
+    rows = tree.xpath(HISTORY_ROWS)
+    for i, row in enumerate(rows[:count]):
+        game = copy.deepcopy(row)
+        game.xpath(".//div[contains(@class,'gameDuration')]")[0].text = f"{i}min 59s"
+        rows[0].addprevious(game)
+    return lxml.html.tostring(tree, encoding="unicode")
+
+
+def stream(driver, history_path, prune=True):
+    scraper = LogScraper(LINK, driver=driver, auto_scrape=False, csv_path=None, history_path=history_path,
+                         prune=prune)
+    scraper.live = True
+    return scraper.stream()
+
+
+def checkpoint(history_path):
+    with open(history_path + ".checkpoint.json", "r") as file:
+        return json.load(file)
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_interrupted_backfill_resumes(tmp_path, prune):
+    history_path = str(tmp_path / "history.csv")
+    page = fixture_page()
+    with pytest.raises(KeyboardInterrupt):
+        stream(PagedDriver(page, interrupt_at=2), history_path, prune)
+    assert len(pd.read_csv(history_path)) == 100
+    assert not checkpoint(history_path)["complete"]
+    assert stream(PagedDriver(page), history_path, prune) == 50
+    assert checkpoint(history_path)["complete"]
+    driver = PagedDriver(page)
+    assert stream(driver, history_path, prune) == 0
+    assert driver.clicks == 0
+
+
+def test_interrupted_update_resumes(tmp_path):
+    history_path = str(tmp_path / "history.csv")
+    stream(PagedDriver(fixture_page()), history_path)
+    page = with_new_games(fixture_page(), 120)
+    with pytest.raises(KeyboardInterrupt):
+        stream(PagedDriver(page, interrupt_at=1), history_path)
+    assert checkpoint(history_path)["complete"]
+    assert checkpoint(history_path)["resume_from"]
+    assert stream(PagedDriver(page), history_path) == 70
+    history = pd.read_csv(history_path)
+    assert len(history) == 270 and not history['game_key'].duplicated().any()
+    assert checkpoint(history_path) | dict(updated=None) == dict(oldest_date="2025-01-01", complete=True,
+                                                                 resume_from=None, updated=None)
+
+
+def test_update_crashing_while_writing_resumes(tmp_path, monkeypatch):
+    history_path = str(tmp_path / "history.csv")
+    stream(PagedDriver(fixture_page()), history_path)
+    page = with_new_games(fixture_page(), 120)
+    to_csv = pd.DataFrame.to_csv
+    writes = []
+
+    def crash_after_first_write(frame, *args, **kwargs):
+        # The first batch of new games reaches the history, then the run dies before anything else
+        to_csv(frame, *args, **kwargs)
+        writes.append(len(frame))
+        raise KeyboardInterrupt
+    monkeypatch.setattr(pd.DataFrame, "to_csv", crash_after_first_write)
+    with pytest.raises(KeyboardInterrupt):
+        stream(PagedDriver(page), history_path)
+    monkeypatch.setattr(pd.DataFrame, "to_csv", to_csv)
+    assert writes == [50]
+    assert len(pd.read_csv(history_path)) == 200
+    assert stream(PagedDriver(page), history_path) == 70
+    assert len(pd.read_csv(history_path)) == 270
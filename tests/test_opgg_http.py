@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from driver_pool import DriverPool
+from opgg_http import FIXTURE_DIR, parse_profile, parse_queue_tab, serve_fixtures
+from opgg_Scraper import OpggScraper
+from replay_driver import OPGG_BASE_URL, ReplayDriver, fixture_pages
+
+
+def fixture(file_name):
+    with open(os.path.join(FIXTURE_DIR, file_name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.fixture
+def base_url():
+    server, url = serve_fixtures()
+    yield url
+    server.shutdown()
+
+
+def test_parse_profile():
+    profile = parse_profile(fixture("Fixture-NA1.html"))
+    assert profile["current_rank"] == "Gold 2"
+    assert profile["seasons"] == ["S2024 S3", "S2024 S2", "S2023 S2"]
+    assert profile["past_ranks"][1:] == ["Gold 3", "Silver 1", "Platinum 4"]
+    assert profile["mastery"] == ["Thresh", "Nami", "Ezreal", "Jinx"]
+
+
+def test_parse_unranked_profile():
+    profile = parse_profile(fixture("Unranked-NA1.html"))
+    assert profile["current_rank"] == "Unranked"
+    assert profile["seasons"] == [] and profile["past_ranks"] == []
+
+
+def test_parse_queue_tab():
+    tab = parse_queue_tab(fixture("Fixture-NA1_SOLORANKED.html"))
+    assert len(tab["avg_tiers"]) == len(tab["champs"]) == 20
+    assert len(tab["summoner_names"]) == 200
+    assert tab["avg_tiers"][:3] == ["Platinum 4", "Silver 1", "Silver 1"]
+    assert tab["champs"][:3] == ["Nami", "Thresh", "Vi"]
+    assert parse_queue_tab(fixture("Unranked-NA1_SOLORANKED.html")) == dict(avg_tiers=[], summoner_names=[], champs=[])
+
+
+def test_not_a_profile():
+    with pytest.raises(ValueError):
+        parse_profile("<html><body><h1>Not Found</h1></body></html>")
+
+
+def test_http_scrape(base_url):
+    links = [f"{base_url}/summoners/na/{name}" for name in ["Fixture-NA1", "Unranked-NA1", "Missing-NA1"]]
+    scraper = OpggScraper(player_list=links, backend="http", selenium_fallback=False)
+    results = scraper.scrape_all()
+    scraper.quit_driver()
+    assert results["Fixture#NA1"]["status"] == "ok"
+    assert results["Unranked#NA1"]["status"] == "ok"
+    assert results["Missing#NA1"]["status"] == "failed"
+    assert scraper.player_ranks["Fixture#NA1"]["S2025 S1"] == "Gold 2"
+    assert scraper.player_mastery["Unranked#NA1"] == ["Jinx", "Orianna", "Ahri", "Garen"]
+    assert len(scraper.player_game_ranks["Fixture#NA1"]) == OpggScraper.MAX_GAME_RANKS
+    assert sum(sum(champs.values()) for champs in scraper.player_champs["Fixture#NA1"].values()) == 40
+
+
+def test_selenium_fallback_starts_over(monkeypatch):
+    link = f"{OPGG_BASE_URL}/Fixture-NA1"
+    pages = fixture_pages()
+    pool = DriverPool(size=1, create_driver=lambda: ReplayDriver(pages))
+    expected = OpggScraper(link=link, driver_pool=pool)
+    expected.scrape_all()
+
+    scraper = OpggScraper(link=link, driver_pool=pool, backend="http")
+    monkeypatch.setattr(scraper.http_client, "fetch_pages", lambda link, profile, queues: {
+        "profile": pages[link], **{queue: pages[f"{link}?queue_type={queue}"] for queue in queues}})
+    record_queue_tab = scraper.record_queue_tab
+    failed = []
+
+    def fail_after_normal(player, tab, game_mode):
+        # The NORMAL games of the http attempt are recorded before it fails, selenium then records every tab
+        record_queue_tab(player, tab, game_mode)
+        if game_mode == "NORMAL" and not failed:
+            failed.append(game_mode)
+            raise ValueError("Tab could not be read")
+    monkeypatch.setattr(scraper, "record_queue_tab", fail_after_normal)
+    result = scraper.scrape_all()["Fixture#NA1"]
+    pool.close()
+    assert result["status"] == "ok"
+    assert scraper.player_game_ranks["Fixture#NA1"] == expected.player_game_ranks["Fixture#NA1"]
+    assert scraper.player_champs["Fixture#NA1"] == expected.player_champs["Fixture#NA1"]
+    assert sum(scraper.player_recent_roles["Fixture#NA1"].values()) == \
+        sum(expected.player_recent_roles["Fixture#NA1"].values())
+
+
+def test_ranks_only_scrapes_games_when_none_are_stored():
+    link = f"{OPGG_BASE_URL}/Fixture-NA1"
+    pool = DriverPool(size=1, create_driver=lambda: ReplayDriver(fixture_pages()))
+    full = OpggScraper(link=link, driver_pool=pool)
+    full.scrape_all()
+    scraper = OpggScraper(link=link, driver_pool=pool, scrape_profile="ranks-only")
+    result = scraper.scrape_all()["Fixture#NA1"]
+    assert result["status"] == "ok"
+    assert scraper.player_game_ranks["Fixture#NA1"] == full.player_game_ranks["Fixture#NA1"]
+    # Once games are stored only the profile is read again
+    history = {"Fixture#NA1": dict(game_ranks=["Gold 1"], last_games=full.last_seen_games["Fixture#NA1"])}
+    scraper = OpggScraper(link=link, driver_pool=pool, scrape_profile="ranks-only", history=history)
+    scraper.scrape_all()
+    pool.close()
+    assert scraper.player_game_ranks["Fixture#NA1"] == ["Gold 1"]
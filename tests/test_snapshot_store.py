@@ -0,0 +1,18 @@
+from snapshot_store import SnapshotStore
+
+PLAYER = "Fixture#NA1"
+
+
+def test_index_is_read_once_and_kept_up_to_date(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.put(PLAYER, "opgg", "profile", "<html>old</html>")
+    assert store.latest_html(PLAYER, "opgg") == {"profile": "<html>old</html>"}
+    store.put(PLAYER, "opgg", "profile", "<html>new</html>")
+    store.put("Other#NA1", "log", "match_history", "<html>log</html>")
+    assert store.latest_html(PLAYER, "opgg") == {"profile": "<html>new</html>"}
+    assert store.players() == [PLAYER, "Other#NA1"]
+    assert store.players(source="log") == ["Other#NA1"]
+    # A store opened later reads the same index from disk
+    reopened = SnapshotStore(str(tmp_path))
+    assert reopened.entries(PLAYER, "opgg") == store.entries(PLAYER, "opgg")
+    assert len(reopened.entries()) == 3